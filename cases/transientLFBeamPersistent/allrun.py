@@ -0,0 +1,22 @@
+from pyFSI.execution.case import *
+import numpy as np
+import sys
+
+# Persistent monolithic integration with automatic stepping, deltaT is the
+# first output step and the output is written every writeInterval
+caseName = "transientLFBeamPersistent"
+
+# Create a log file
+sys.stdout = io.Logger()
+
+# Create the case object
+case = MFSICase(caseName)
+
+# Solve the case
+case.solve()
+
+# Check that the run reached the end time and wrote one line per writeInterval
+time = np.loadtxt("fsi/time.out")
+if not np.isclose(time[-1], 0.02) or len(time) != 20:
+    sys.exit("ERROR: The persistent run stopped at time " + str(time[-1]) + " after " + str(len(time)) + " outputs")
+print("---> Persistent run reached the end time with", len(time), "outputs")
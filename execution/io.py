@@ -13,6 +13,7 @@ class IOFile:
     """
     def __init__(self, obj, variable, mode='a+', bufferSize=1):
         filename = variable + ".out"
+        self.variable = variable
         self.location = obj.path / filename
         self.obj = obj  # Object from which we read the data
         # Get the variable
@@ -106,8 +107,15 @@ class IODataBase:
                 file = IOFile(obj, i)
                 self.files.append(file)
 
-    def write(self):
+    def write(self, skip=(), only=None):
+        """
+        Write all the files. skip and only are lists of (object name, variable) pairs, the files in skip are not
+        written and, if only is given, only its files are written.
+        """
         for file in self.files:
+            key = (file.obj.name, file.variable)
+            if key in skip or (only is not None and key not in only):
+                continue
             file.write()
 
     def close(self):
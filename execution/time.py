@@ -18,9 +18,79 @@ class time:
             "time":       "value"
         }
 
+        # ----- Private attributes ----- #
+        # Automatic stepping: deltaT is the initial step, the output is written
+        # every writeInterval (every accepted step if it is not given) and the
+        # step is kept in [minDeltaT, maxDeltaT] (unlimited by default)
+        if self.stepping == 'automatic':
+            timeDict = execution['time']
+            if 'writeInterval' in timeDict:
+                self._writeInterval = timeDict['writeInterval']
+            else:
+                self._writeInterval = None
+            if 'minDeltaT' in timeDict:
+                self._minDelta = timeDict['minDeltaT']
+            else:
+                self._minDelta = 1E-3 * self.delta
+            if 'maxDeltaT' in timeDict:
+                self._maxDelta = timeDict['maxDeltaT']
+            else:
+                self._maxDelta = np.inf
+            if self._writeInterval is not None:
+                self._nextWrite = self.start + self._writeInterval
+            else:
+                self._nextWrite = self.end
+            self._write = False
+
     def elapsed(self):
         return tt.perf_counter() - self.startDate
 
     def advance(self):
-        self.value += self.delta
-        self.span += self.delta
+        delta = self.delta
+        # Land exactly on the next output time (without leaving a tiny step)
+        if self.stepping == 'automatic':
+            remaining = min(self._nextWrite, self.end) - self.value
+            if remaining <= 1.01 * delta:
+                delta = remaining
+            elif remaining < 2.0 * delta:
+                delta = 0.5 * remaining
+        # The span goes from the previous time to the new one
+        self.span = np.array([self.value, self.value + delta])
+        self.value += delta
+        if self.stepping == 'automatic':
+            self._write = self._writeInterval is None or delta == remaining
+
+    # True while there are steps to solve
+    def running(self):
+        if self.stepping == 'automatic':
+            return self.value < self.end - 1E-9 * self._minDelta
+        return self.value <= self.end
+
+    # Choose the next step from the normalized error of the last one (error <= 1
+    # is accepted). If the step is rejected the time goes back to the beginning
+    # of the step. Returns True if the step is accepted
+    def adapt(self, error):
+        if self.stepping != 'automatic' or error is None:
+            return True
+        delta = self.span[1] - self.span[0]  # Step actually taken
+        if error > 0.0:
+            factor = min(5.0, max(0.2, 0.9 * error ** -0.5))
+        else:
+            factor = 5.0
+        accepted = error <= 1.0 or delta <= self._minDelta
+        if not accepted:
+            self.value = self.span[0]
+            self._write = False
+        self.delta = min(max(delta * factor, self._minDelta), self._maxDelta)
+        return accepted
+
+    # True if the output has to be written at the current time
+    def write(self):
+        if self.stepping != 'automatic':
+            return True
+        if self._write:
+            if self._writeInterval is not None:
+                self._nextWrite += self._writeInterval
+            self._write = False
+            return True
+        return False
@@ -11,6 +11,7 @@
 #
 # --------------------------------------------------------------------------- #
 import numpy as np
+import scipy.integrate as si
 from abc import ABCMeta, abstractmethod
 # 1D Mesh creation.  We can use different creation methods (@classmethod)
 
@@ -28,6 +29,7 @@ class fsiMesh1D(object):
 
         # ----- Private attributes ----- #
         self._debug = False
+        self._simpson = None  # Simpson quadrature weights (lazy)
 
     # Factory Methods:
     # Here the @classmethods act as different constructors, Note that we also
@@ -58,4 +60,19 @@ class fsiMesh1D(object):
     def debug(self):
         return self._debug
 
+    # Quadrature weights w of the Simpson rule on the mesh, si.simps(f, x) = w.f
+    # for any f sampled on x. Built once from the rule applied to the unit
+    # vectors (in blocks to bound the memory)
+    def simpsonWeights(self):
+        if self._simpson is None:
+            w = np.zeros(self.size)
+            block = 256
+            for i in range(0, self.size, block):
+                rows = np.arange(i, min(i + block, self.size))
+                unit = np.zeros((rows.size, self.size))
+                unit[np.arange(rows.size), rows] = 1.0
+                w[rows] = si.simps(unit, self.x)
+            self._simpson = w
+        return self._simpson
+
 
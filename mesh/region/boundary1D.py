@@ -31,6 +31,8 @@ class boundary1D(metaclass=ABCMeta):
         self.dyi = None  # Indefinite spatial integral of the first time derivative
         self.ddyi = None  # Indefinite spatial integral of the second time deriv
         self.isCoupled = coupled  # if the field is coupled with precice or other
+        self.version = 0  # Geometry version, increased every time the boundary moves
+        self.line = None  # (slope, intercept) if the boundary is a straight line at rest
 
         # ----- Private attributes ----- #
         self._mesh = mesh
@@ -60,7 +62,9 @@ class boundary1D(metaclass=ABCMeta):
         slope = (hf - hi) / (xvalues[-1] - xvalues[0])
         for i, x in enumerate(xvalues):
             yvalues[i] = slope * x + hi
-        return cls(mesh, name, yvalues)
+        boundary = cls(mesh, name, yvalues)
+        boundary.line = (slope, hi)
+        return boundary
 
     @classmethod
     def fromPoints(cls, mesh, dict, name=None):
@@ -12,9 +12,15 @@ class boundary1DBeam(boundary1D):
         # ----- Private attributes ----- #
         self._beam = beam
         self._control = control  # Reference to the control dictionary
+        self._beamVersion = None  # Beam version of the current geometry
 
     # ----- Abstract methods ----- #
     def update(self):
+        # Nothing to do if the beam has not moved
+        if self._beam.version == self._beamVersion:
+            return
+        self._beamVersion = self._beam.version
+        self.version += 1
         # Update the position of the boundary
         self.y = self._beam.y[self._control['surface']]
         # Update the time derivatives
@@ -22,6 +28,11 @@ class boundary1DBeam(boundary1D):
         self.ddy = self._beam.ddy['mid']
         self.dyi = si.cumtrapz(self.dy, self._mesh.x, initial=0.0)
         self.ddyi = si.cumtrapz(self.ddy, self._mesh.x, initial=0.0)
+        # The surface of the beam at rest is a straight line
+        if not (np.any(self._beam.a) or np.any(self._beam.da) or np.any(self._beam.dda)):
+            self.line = (0.0, self.y[0])
+        else:
+            self.line = None
         # Re calculate the spatial derivatives and integrals
         self.calculate()
 
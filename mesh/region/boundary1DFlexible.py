@@ -29,7 +29,9 @@ class boundary1DFlexible(boundary1D):
         # self.Forces = np.zeros_like(self.vertices)  # Force to transfer
 
     def setField(self, fieldName, data):
+        self.version += 1
         if fieldName == "Displacements":
+            self.line = None  # The boundary is no longer straight
             self.y = self.y0 + data[0:self._mesh.size, 1]
             self.vertices[0:self._mesh.size, 1] = self.y
             self.vertices[self._mesh.size:self._mesh.size*2, 1] = self.y
@@ -23,6 +23,8 @@ class fsiRegion1D(object):
         # ----- Public attributes ----- #
         self.name = control['name']
         self.type = control['type']
+        self.version = 0  # Geometry version, increased when any boundary moves
+        self.line = None  # (slope, intercept) of the size if both boundaries are straight at rest
 
         # General container for derivatives, integrals, sizes
         self.data = {'s':       np.empty(mesh.size),
@@ -38,25 +40,34 @@ class fsiRegion1D(object):
         self._bBot = boundary[control['botBoundary']]  # Top boundary
         self._bTop = boundary[control['topBoundary']]   # Bottom boundary
         self._debug = mesh.debug()
+        self._bVersions = None  # Boundary versions of the current data
 
         # ----- Procedures ----- #
         # Find the associated flexible boundary
         if self._bBot.isFlexible():
             flexBoundary = self._bBot
+            self._flexSign = -1  # The size decreases when the bottom boundary moves up
         elif self._bTop.isFlexible():
             flexBoundary = self._bTop
+            self._flexSign = 1
         else:
             flexBoundary = None
+            self._flexSign = 0
             print("     WARNING: No flexible boundary found for region" + self.name)
 
-        self._eigen = flexBoundary.eigen()
+        self._flexBoundary = flexBoundary
+        self._eigen = flexBoundary.eigen() if flexBoundary is not None else None
         if self._debug:
             self.check()
 
-    # Update the geometric data
+    # Update the geometric data (only if a boundary has moved)
     def update(self):
         self._bTop.update()
         self._bBot.update()
+        if self._bVersions == (self._bTop.version, self._bBot.version):
+            return
+        self._bVersions = (self._bTop.version, self._bBot.version)
+        self.version += 1
         self.data['s'] = self._bTop.y - self._bBot.y
         self.data['six'] = self._bTop.ix - self._bBot.ix
         self.data['siL'] = self._bTop.iL - self._bBot.iL
@@ -64,6 +75,23 @@ class fsiRegion1D(object):
         self.data['dds'] = self._bTop.ddy - self._bBot.ddy
         self.data['dsi'] = self._bTop.dyi - self._bBot.dyi
         self.data['ddsi'] = self._bTop.ddyi - self._bBot.ddyi
+        # Linear size, the integrals of the size can be calculated in closed form
+        if self._bTop.line is not None and self._bBot.line is not None:
+            self.line = (self._bTop.line[0] - self._bBot.line[0], self._bTop.line[1] - self._bBot.line[1])
+        else:
+            self.line = None
+
+    # Indefinite integral of s**-p from the beginning of the channel, in closed
+    # form for linear sizes s = m*x + c (only valid if self.line is set)
+    def inverseSizeIntegral(self, p):
+        x = self._mesh.x
+        s = self.data['s']
+        m = self.line[0]
+        if abs(m) * (x[-1] - x[0]) < 1E-10 * s[0]:  # Constant size
+            return (x - x[0]) / s[0] ** p
+        if p == 1:
+            return np.log(s / s[0]) / m
+        return (s[0] ** (1 - p) - s ** (1 - p)) / ((p - 1) * m)
 
     def check(self):
         # Check if the mesh density is ok
@@ -80,6 +108,14 @@ class fsiRegion1D(object):
     def eigen(self):
         return self._eigen
 
+    # Return reference to the flex boundary object
+    def flexBoundary(self):
+        return self._flexBoundary
+
+    # Sign of the flexible boundary motion in the region size (s = top - bot)
+    def flexSign(self):
+        return self._flexSign
+
     # Reference to the boundary objects
     def top(self):
         return self._bTop
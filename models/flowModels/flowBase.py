@@ -28,7 +28,8 @@ class flowModel(metaclass=ABCMeta):
         self.dRef = None  # Reference inlet size
         self.output = []
         self.path = execution['paths']['flowPath']  # Associated path
-        self.dimNumbers = {}  # Dimensionless numbers
+        self._dimNumbers = {}  # Dimensionless numbers (see dimNumbers)
+        self._numbersKey = None  # State key of the dimensionless numbers
         self.varMap = {
             "numbers":      "dimNumbers"
         }
@@ -59,9 +60,25 @@ class flowModel(metaclass=ABCMeta):
     # Calculate the dimensionless numbers
     def calcNumbers(self):
         """ Calculates dimensionless numbers"""
-        self.dimNumbers["Re"] = ReynoldsNumber(self)
-        self.dimNumbers["Rd"] = ReynoldsNumber(self, type="Rd")
-        self.dimNumbers["Fr"] = FroudeNumber(self)
+        self._dimNumbers["Re"] = ReynoldsNumber(self)
+        self._dimNumbers["Rd"] = ReynoldsNumber(self, type="Rd")
+        self._dimNumbers["Fr"] = FroudeNumber(self)
+
+    # The dimensionless numbers are only needed for output and information,
+    # so they are calculated when requested and not in every update, and kept
+    # until the state key changes
+    @property
+    def dimNumbers(self):
+        key = self.numbersKey()
+        if key is None or key != self._numbersKey:
+            self.calcNumbers()
+            self._numbersKey = key
+        return self._dimNumbers
+
+    # Key of the flow state for the dimensionless numbers, None if the model
+    # has no state counters (the numbers are calculated in every request)
+    def numbersKey(self):
+        return None
 
     # Pure virtual methods
 
@@ -37,7 +37,6 @@ class leakageFlow2D(flowModel):
         self.Q0 = None  # Flow rate at (x,t) = (0, 0)
         self.v0 = None  # Flow speed
         self.eRef = None
-        self.bLayer = None  # Boundary layer
         self.updated = False
         self.m = None  # Mass vector
         self.k = None  # Stiffness vector
@@ -61,6 +60,11 @@ class leakageFlow2D(flowModel):
         self.vRef = None   # Reference velocity
         self.eRef = None   # Size quotient
         self._size = self.regions[0].eigen().size  # Size of the associated eigensystem
+        self._geometryVersion = {}  # Region versions of the geometric data
+        self._state = 0  # Counter of the flow updates
+        self._modes = {}  # Modal bases of the regions (see modes)
+        self._zetaIn = None  # Loss factors of the current update
+        self._zetaOut = None
 
         # ----- Procedures ----- #
         # Initialize the boundary conditions
@@ -84,34 +88,42 @@ class leakageFlow2D(flowModel):
         self.update()
 
     def update(self):
+        self._state += 1
         # Flow rate (reads the key Qt that is added to the casecontrol by the solver)
         self.Q0 = self._Q0InBC.getValue(self._time.value)
 
-        # Update the geometry intermediate variables
+        # Update the geometry intermediate variables (only if the region moved)
         for region in self.regions:
             region.update()  # Update to read the initialized channel size
+            if self._geometryVersion.get(region.name) == region.version:
+                continue
+            self._geometryVersion[region.name] = region.version
             # regionObj.data['name'] = region['name']
             region.data['he'] = region.data['s']   # Initial size of the region
             region.data['he0'] = region.data['he'][0]
             region.data['he2'] = region.data['he'] ** 2
             region.data['he3'] = region.data['he'] ** 3
             region.data['he4'] = region.data['he'] ** 4
-            region.data['hed'] = np.gradient(region.data['he'], self._mesh.x, edge_order=2)
-            region.data['hex'] = si.cumtrapz(1.0 / region.data['he'], self._mesh.x, initial=0.0)
-            region.data['heL'] = si.simps(1.0 / region.data['he'], self._mesh.x)
+            if region.line is not None:  # Straight channel, closed form integrals
+                region.data['hed'] = np.full(self._mesh.size, region.line[0])
+                region.data['hex'] = region.inverseSizeIntegral(1)
+                region.data['heL'] = region.data['hex'][-1]
+            else:
+                region.data['hed'] = np.gradient(region.data['he'], self._mesh.x, edge_order=2)
+                region.data['hex'] = si.cumtrapz(1.0 / region.data['he'], self._mesh.x, initial=0.0)
+                region.data['heL'] = si.simps(1.0 / region.data['he'], self._mesh.x)
             region.data['hexL'] = region.data['hex'] / region.data['heL']
 
-        # Dimensionless numbers and boundary layer
+        # Reference values (the dimensionless numbers and the boundary layer
+        # are calculated when requested)
         self.dRef = list(self.regions)[0].data['he0']
         self.lRef = self._mesh.L
         self.vRef = self.Q0 / self.dRef
         self.eRef = self.dRef / self.lRef
-        self.bLayer = boundaryLayer(self, xPosition=self.lRef)
         self.v0 = self.Q0 / self.dRef
-        super().calcNumbers()
 
         # Nonlinear profile (xix), viscous friction (f0) and derivative of f0 (eta)
-        Rd = self.dimNumbers['Rd'].value
+        Rd = self._fluid['rho'] * self.vRef * self.dRef / self._fluid['mu']
         if Rd < 1:  # Laminar
             self._f0 = 48.0 / Rd
             self._xix = 6.0 / 5.0
@@ -122,6 +134,11 @@ class leakageFlow2D(flowModel):
             self._eta = -(0.0624 * Rd**-0.24) / self.Q0
             # self._eta2 = -0.0624 * self._fluid['nu']**0.24 / self.Q0**1.24
 
+        # Boundary values and modal bases, fetched once for all the vectors
+        self._zetaIn = self._zetaInBC.getValue(self._time.value)
+        self._zetaOut = self._zetaOutBC.getValue(self._time.value)
+        self._modes = {region.name: self.modes(region) for region in self.regions}
+
         # Update the flow vectors
         self.m = self._m()
         self.k = self._k()
@@ -134,15 +151,32 @@ class leakageFlow2D(flowModel):
 
         self.updated = True
 
+    # The flow and the geometry only change in update
+    def numbersKey(self):
+        return self._state
+
+    # Boundary layer at the channel exit
+    @property
+    def bLayer(self):
+        return boundaryLayer(self, xPosition=self.lRef)
+
+    # Modes of the flexible boundary of a region as (nModes, nx) arrays
+    @staticmethod
+    def modes(region):
+        eigen = region.eigen()
+        return {'g': np.array([np.asarray(g, dtype=float) for g in eigen.vectors]),
+                'gd': np.array([np.asarray(g, dtype=float) for g in eigen.d1]),
+                'gx': np.array([np.asarray(g, dtype=float) for g in eigen.ix]),
+                'iL': np.asarray(eigen.iL, dtype=float)}
+
+    # The vectors of all the modes are rows of (nModes, nx) arrays
     # Mass vector
     def _m(self):
-        m = np.zeros(self._size, dtype=object)
-        # Loop each region
-        for region in self.regions:  # Loop for filling the mass matrix
+        m = 0
+        for region in self.regions:
             r = region.data
-            # Loop each mode
-            for i in range(0, self._size):
-                m[i] += self.integrate(region.eigen().ix[i] / r['he'], region)
+            g = self._modes[region.name]
+            m = m + self.integrate(g['gx'] / r['he'], region)
 
         M = -self._fluid['rho'] * m
 
@@ -150,26 +184,23 @@ class leakageFlow2D(flowModel):
 
     # Stiffness vector
     def _k(self):
-        knl = np.zeros(self._size, dtype=object)  # Non Linear added stiffness
-        kio = np.zeros(self._size, dtype=object)  # Input-Output added stiffness
-        kvf = np.zeros(self._size, dtype=object)  # Viscous friction added stiffness
-
-        # Loop each region
-        for region in self.regions:  # Loop for filling the mass matrix
-            # Loop each mode
-            for i in range(0, self._size):
-                gi = region.eigen().vectors[i]
-                r = region.data
-                # Nonlinear profile stiffness
-                tnl = 3 * gi * r['hed'] / r['he4'] - gi.d1 / r['he3']
-                knl[i] += self._xix * self.integrate(tnl, region)
-                # Viscous friction stiffness
-                tvf = - gi / r['he4']
-                kvf[i] += (3.0 * self._f0 / 4.0) * self.integrate(tvf, region)
-                # Inlet-outlet stiffness
-                tio0 = self._zetaInBC.getValue(self._time.value) * gi[0] / r['he3'][0]
-                tio1 = self._zetaOutBC.getValue(self._time.value) * gi[-1] / r['he3'][-1]
-                kio[i] += (tio0 + tio1) * r['hexL'] - tio0
+        knl = 0  # Non Linear added stiffness
+        kio = 0  # Input-Output added stiffness
+        kvf = 0  # Viscous friction added stiffness
+
+        for region in self.regions:
+            g = self._modes[region.name]
+            r = region.data
+            # Nonlinear profile stiffness
+            tnl = 3 * g['g'] * r['hed'] / r['he4'] - g['gd'] / r['he3']
+            knl = knl + self._xix * self.integrate(tnl, region)
+            # Viscous friction stiffness
+            tvf = - g['g'] / r['he4']
+            kvf = kvf + (3.0 * self._f0 / 4.0) * self.integrate(tvf, region)
+            # Inlet-outlet stiffness
+            tio0 = (self._zetaIn * g['g'][:, 0] / r['he3'][0])[:, None]
+            tio1 = (self._zetaOut * g['g'][:, -1] / r['he3'][-1])[:, None]
+            kio = kio + (tio0 + tio1) * r['hexL'] - tio0
 
         K = self._fluid['rho'] * self.Q0**2 * (knl + kio + kvf)
 
@@ -177,27 +208,21 @@ class leakageFlow2D(flowModel):
 
     # Damping vector
     def _c(self):
-        cnl = np.zeros(self._size, dtype=object)  # Non Linear added stiffness
-        cio = np.zeros(self._size, dtype=object)  # Input-Output added stiffness
-        cvf = np.zeros(self._size, dtype=object)  # Viscous friction added stiffness
-        # Loop (and SUM!)each region
-        for region in self.regions:  # Loop for filling the damping matrix
-            x = self._mesh.x
-            # Loop each mode
-            for i in range(self._size):
-                gi = region.eigen().vectors[i]
-                r = region.data
-                gix = region.eigen().ix[i]
-                # Nonlinear profile damping
-                tnl = gix * r['hed'] / r['he3'] - gi / r['he2']
-                cnl[i] += 2.0 * self._xix * self.integrate(tnl, region)
-                # Viscous friction damping
-                tvf = - gix / r['he3']
-                cvf[i] += ((0.5 * self._f0 + 0.25 * self.Q0 * self._eta) * 
-                           self.integrate(tvf, region))
-                # Inlet-outlet damping
-                cio[i] += ((self._zetaOutBC.getValue(self._time.value) / r['he2'][-1]) * 
-                           region.eigen().iL[i] * r['hexL'])
+        cnl = 0  # Non Linear added damping
+        cio = 0  # Input-Output added damping
+        cvf = 0  # Viscous friction added damping
+        for region in self.regions:
+            g = self._modes[region.name]
+            r = region.data
+            # Nonlinear profile damping
+            tnl = g['gx'] * r['hed'] / r['he3'] - g['g'] / r['he2']
+            cnl = cnl + 2.0 * self._xix * self.integrate(tnl, region)
+            # Viscous friction damping
+            tvf = - g['gx'] / r['he3']
+            cvf = cvf + ((0.5 * self._f0 + 0.25 * self.Q0 * self._eta) *
+                         self.integrate(tvf, region))
+            # Inlet-outlet damping
+            cio = cio + ((self._zetaOut / r['he2'][-1]) * g['iL'][:, None] * r['hexL'])
 
         C = self._fluid['rho'] * self.Q0 * (cnl + cio + cvf)
 
@@ -208,105 +233,86 @@ class leakageFlow2D(flowModel):
         Tf = {}  # One vector T for each region
         for region in self.regions:
             r = region.data
-            tnl = np.zeros(1, dtype=object)
-            tio = np.zeros(1, dtype=object)
-            tvf = np.zeros(1, dtype=object)
+            tvf = 0  # The friction term (tfv) is not included
             # Nonlinear term
             tnl = 2.0 * self._xix * self.integrate(r['hed'] / r['he3'], region)
             # Viscous Friction term
-            tfv = -((0.5 * self._f0 + 0.25 * self.Q0 * self._eta) * 
+            tfv = -((0.5 * self._f0 + 0.25 * self.Q0 * self._eta) *
                     self.integrate(1 / r['he3'], region))
             # Inlet-outlet Term
-            t0 = self._zetaInBC.getValue(self._time.value) / r['he2'][0]
-            t1 = self._zetaOutBC.getValue(self._time.value) / r['he2'][-1]
+            t0 = self._zetaIn / r['he2'][0]
+            t1 = self._zetaOut / r['he2'][-1]
             tio = (t0 + t1) * r['hexL'] - t0
             # Output as dictionary, one vector per region
             Tf[region.name] = self._th * self._fluid['rho'] * self.Q0 * (tnl + tio + tvf)
 
         return Tf
 
+    # The flow rate vectors are summed over the modes
     def _Bq(self):
         Bq = {}
-        for region in self.regions:  # Loop for filling the damping matrix
+        x = self._mesh.x
+        for region in self.regions:
             r = region.data
-            Bq[region.name] = np.zeros(1, dtype=object)
-            for i in range(self._size):
-                Bq[region.name] += - (self._th * si.simps(region.eigen().ix[i] /
-                                    r['he'], self._mesh.x) / r['heL'])
+            g = self._modes[region.name]
+            Bq[region.name] = np.array([np.sum(-(self._th * si.simps(g['gx'] / r['he'], x) / r['heL']))])
         return Bq
 
     def _Dq(self):
         Dq = {}
-        for region in self.regions: # Loop for filling the damping matrix
+        x = self._mesh.x
+        for region in self.regions:
             r = region.data
-            dnl = np.zeros(1, dtype=object)
-            dio = np.zeros(1, dtype=object)
-            dvf = np.zeros(1, dtype=object)
-            for i in range(self._size):
-                # Nonlinear term
-                dnl += (2 * self._xix * si.simps(region.eigen().ix[i] * r['hed'] / r['he3']
-                        - region.eigen().vectors[i] / r['he2'], self._mesh.x))
-                # Friction term
-                dvf += -((0.5 * self._f0 + 0.25 * self.Q0 * self._eta) * 
-                         si.simps(region.eigen().ix[i] / r['he3'], self._mesh.x))
-                # Boundary Terms
-                dio += -self._zetaOutBC.getValue(self._time.value) / r['he2'][-1] * region.eigen().iL[i]
-
-            Dq[region.name] = self._th * self.Q0 / r['heL'] * (dnl + dio + dvf)
+            g = self._modes[region.name]
+            # Nonlinear term
+            dnl = np.sum(2 * self._xix * si.simps(g['gx'] * r['hed'] / r['he3'] - g['g'] / r['he2'], x))
+            # Friction term
+            dvf = np.sum(-((0.5 * self._f0 + 0.25 * self.Q0 * self._eta) * si.simps(g['gx'] / r['he3'], x)))
+            # Boundary Terms
+            dio = np.sum(-self._zetaOut / r['he2'][-1] * g['iL'])
+
+            Dq[region.name] = np.array([self._th * self.Q0 / r['heL'] * (dnl + dio + dvf)])
 
         return Dq
 
     def _Eq(self):
         Eq = {}
-        for region in self.regions:  # Loop for filling the damping matrix
+        x = self._mesh.x
+        for region in self.regions:
             r = region.data
-            enl = np.zeros(1, dtype=object)
-            eio = np.zeros(1, dtype=object)
-            evf = np.zeros(1, dtype=object)
-            for i in range(0, self._size):
-                gi = region.eigen().vectors[i]
-                gid = region.eigen().d1[i]
-                # Nonlinear term
-                enl += (self._xix * si.simps(3 * gi * r['hed'] / r['he4'] 
-                        - gid / r['he3'], self._mesh.x))
-                # [region.name]Friction Term
-                evf += -(3.0 * self._f0 / 4) * si.simps(gi / r['he4'], self._mesh.x)
-                # Boundary Term
-                eio += -((self._zetaInBC.getValue(self._time.value) * gi[0] / r['he3'][0] 
-                          + self._zetaOutBC.getValue(self._time.value) * gi[-1] / r['he3'][-1]))
-
-            Eq[region.name] = self._th * self.Q0**2 / r['heL'] * (enl + eio + evf)
+            g = self._modes[region.name]
+            # Nonlinear term
+            enl = np.sum(self._xix * si.simps(3 * g['g'] * r['hed'] / r['he4'] - g['gd'] / r['he3'], x))
+            # Friction Term
+            evf = np.sum(-(3.0 * self._f0 / 4) * si.simps(g['g'] / r['he4'], x))
+            # Boundary Term
+            eio = np.sum(-(self._zetaIn * g['g'][:, 0] / r['he3'][0] + self._zetaOut * g['g'][:, -1] / r['he3'][-1]))
+
+            Eq[region.name] = np.array([self._th * self.Q0**2 / r['heL'] * (enl + eio + evf)])
 
         return Eq
 
     def _Gq(self):
         Gq = {}
-        for region in self.regions:  # Loop for filling the damping matrix
+        x = self._mesh.x
+        for region in self.regions:
             r = region.data
-            Gq[region.name] = np.zeros(1, dtype=object)
-            for i in range(self._size):
-                gi = region.eigen().vectors[i]
-                gid = region.eigen().d1[i]
-                # Nonlinear term
-                Gq[region.name] += 2 * self._xix * si.simps(r['hed'] / r['he3'],
-                                                            self._mesh.x)
-                # Friction Term
-                Gq[region.name] += -((0.5 * self._f0 + 0.25 * self.Q0 * self._eta) *
-                                   si.simps(1 / r['he3'], self._mesh.x))
-                # Boundary Term
-                Gq[region.name] += -((self._zetaInBC.getValue(self._time.value) / r['he2'][0]
-                                     + self._zetaOutBC.getValue(self._time.value) / r['he2'][-1]))
-
-            Gq[region.name] *= self._th * (self.Q0 / r['heL'])
+            # The terms do not depend on the mode, they are added once per mode
+            gq = (2 * self._xix * si.simps(r['hed'] / r['he3'], x)
+                  - (0.5 * self._f0 + 0.25 * self.Q0 * self._eta) * si.simps(1 / r['he3'], x)
+                  - (self._zetaIn / r['he2'][0] + self._zetaOut / r['he2'][-1]))
+            Gq[region.name] = np.array([self._size * gq * self._th * (self.Q0 / r['heL'])])
 
         return Gq
 
+    # Integral of term from 0 to x minus its fraction hexL of the integral
+    # over the channel, along the last axis
     def integrate(self, term, region):
         # Routine for a common inte
         # gration pattern in matrices from Tosi Appendix A
         x = self._mesh.x
-        return (si.cumtrapz(term, x, initial=0.0) -
-                si.simps(term, x) * region.data['hexL'])
+        return (si.cumtrapz(term, x, initial=0.0, axis=-1) -
+                np.expand_dims(si.simps(term, x, axis=-1), -1) * region.data['hexL'])
 
 
 
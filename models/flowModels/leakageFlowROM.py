@@ -0,0 +1,232 @@
+# --------------------------------------------------------------------------- #
+#    p    #     version: 0.1
+#    y    #     date: 18/10/2026
+#    F    #     author: Martin Saravia
+#    S    #     description: Hyper-reduced nonlinear leakage flow operators
+#    I    #     return: rom object
+# --------------------------------------------------------------------------- #
+# Notes:
+#   Reduced evaluation of the nlLeakageFlow2D operators on the eigenbasis of
+#   the flexible boundaries. The size of a region is s = sRest + sign*phi.a,
+#   and its size integrals are dsi = sign*Phi.da, ddsi = sign*Phi.dda, with
+#   Phi the indefinite integrals of the modes phi. Every operator at the exit
+#   and every modal projection of the pressure is an integral of a product of
+#   modes times one of the nonlinear functions g1 = 1/s, g2 = 1/s**2, g3 = 1/s**3
+#   (the Wc terms are integrated by parts). The functions are approximated by
+#   the discrete empirical interpolation method (DEIM):
+#       g ~ U (U[P])^-1 g[P]
+#   with U the POD basis of training geometries and P the DEIM points, so the
+#   integrals are precomputed tensors contracted with g[P] and the modal
+#   coordinates, and their cost does not depend on the mesh size.
+#   The interpolation error is checked at a set of validation points for every
+#   geometry. If it exceeds the tolerance the full model is used instead.
+#   Set in flow:
+#   "rom": {"amplitude": 0.5,    fraction of the rest size closed by the training
+#           "samples": 100,      number of training geometries
+#           "rank": 30,          max size of the DEIM bases
+#           "tolerance": 1E-4}   max relative interpolation error
+# --------------------------------------------------------------------------- #
+import sys
+import numpy as np
+import scipy.integrate as si
+
+
+class leakageFlowROM:
+    def __init__(self, flow, control):
+        # ----- Public attributes ----- #
+        self.evaluations = 0  # Geometries evaluated with the reduced operators
+        self.fallbacks = 0  # Geometries evaluated with the full model
+
+        # ----- Private attributes ----- #
+        self._flow = flow
+        self._rho = flow.fluid()['rho']
+        self._amplitude = 0.5
+        self._samples = 100
+        self._rank = 30
+        self._tolerance = 1E-4
+        if 'amplitude' in control:
+            self._amplitude = control['amplitude']
+        if 'samples' in control:
+            self._samples = control['samples']
+        if 'rank' in control:
+            self._rank = control['rank']
+        if 'tolerance' in control:
+            self._tolerance = control['tolerance']
+        self._regions = []  # Reduced data of each region
+        self._g = None  # Sampled g1, g2, g3 of the current geometry (per region)
+
+        # ----- Procedures ----- #
+        x = flow.mesh().x
+        w = np.zeros(x.size)  # Trapezoidal quadrature weights
+        w[:-1] += 0.5 * np.diff(x)
+        w[1:] += 0.5 * np.diff(x)
+        rng = np.random.default_rng(0)
+        for region in flow.regions:
+            boundary = region.flexBoundary()
+            if boundary is None or not hasattr(boundary, 'beam'):
+                sys.exit("ERROR: The reduced flow model needs a beam boundary in region " + region.name)
+            self._regions.append(self.reduce(region, boundary.beam(), x, w, rng))
+        print("---> Reduced flow model built with DEIM bases of size",
+              [[len(r['P'][p]) for p in range(3)] for r in self._regions])
+
+    # Training, DEIM bases and projection tensors of a region
+    def reduce(self, region, beam, x, w, rng):
+        sign = region.flexSign()
+        phi = np.array([np.asarray(v, dtype=float) for v in region.eigen().vectors])
+        Phi = si.cumtrapz(phi, x, initial=0.0, axis=-1)
+        sRest = region.data['s'] - sign * np.dot(np.asarray(beam.a, dtype=float), phi)
+        n = phi.shape[0]
+
+        # Training geometries, single modes and random combinations scaled to
+        # close at most the amplitude fraction of the rest size
+        A = self._amplitude / np.max(np.abs(phi) / sRest, axis=1)
+        a = [np.zeros(n)]
+        for k in range(n):
+            for f in [-1.0, -0.5, 0.5, 1.0]:
+                a.append(f * A[k] * np.eye(n)[k])
+        for i in range(self._samples):
+            a.append(rng.uniform(-1.0, 1.0, n) * A)
+        S = []
+        for ai in a:
+            ds = sign * np.dot(ai, phi)
+            closure = np.max(-ds / sRest)
+            if closure > self._amplitude:
+                ds *= self._amplitude / closure
+            S.append(sRest + ds)
+        S = np.array(S).T
+
+        # DEIM of g1, g2, g3
+        U, P, V = [], [], []
+        for p in range(1, 4):
+            u, sv, vh = np.linalg.svd(S ** -p, full_matrices=False)
+            r = min(self._rank, np.sum(sv > 1E-2 * self._tolerance * sv[0]))
+            Up, Pp = self.deim(u[:, :r])
+            U.append(Up)
+            P.append(Pp)
+            # Validation points, evenly spaced and out of the DEIM points
+            V.append(np.setdiff1d(np.linspace(0, x.size - 1, 12).astype(int), Pp))
+
+        # Sampling points of the sizes: DEIM, validation and the ends of the channel
+        points = np.unique(np.concatenate(P + V + [[0, x.size - 1]]))
+        index = {j: i for i, j in enumerate(points)}
+        B = [U[p] @ np.linalg.inv(U[p][P[p]]) for p in range(3)]  # g = B g[P]
+        Bv = [B[p][V[p]] for p in range(3)]  # Interpolation at the validation points
+
+        # Projection tensors, R(fx) = int(fx g) = (w fx) B g[P]
+        def R(fx, p):
+            return np.dot(w * fx, B[p])
+        L = -1
+        Psi = Phi[:, L][:, None] - Phi  # int(phi_j F) = int(Psi_j f), F = cumulative integral of f
+        return {'sign': sign,
+                'beam': beam,
+                'sRest': sRest[points],
+                'phi': phi[:, points],
+                'PhiL': Phi[:, L],
+                'points': points,
+                'P': [np.array([index[j] for j in P[p]]) for p in range(3)],
+                'V': [np.array([index[j] for j in V[p]]) for p in range(3)],
+                'Bv': Bv,
+                'end': [index[0], index[x.size - 1]],
+                # Exit values
+                'R1': R(1.0, 0),
+                'R1Phi': R(Phi, 0),
+                'R2phi': R(phi, 1),
+                'R2Phiphi': R(Phi[:, None] * phi[None, :], 1),
+                'R3': R(1.0, 2),
+                'R3Phi': R(Phi, 2),
+                'R3PhiPhi': R(Phi[:, None] * Phi[None, :], 2),
+                # Modal projections
+                'L1Psi': R(Psi, 0),
+                'L1PsiPhi': R(Psi[:, None] * Phi[None, :], 0),
+                'L2S': R(Psi[:, None] * phi[None, :] + phi[:, None] * Phi[None, :], 1),
+                'L2T': R(Psi[:, None, None] * Phi[None, :, None] * phi[None, None, :]
+                         + 0.5 * phi[:, None, None] * Phi[None, :, None] * Phi[None, None, :], 1),
+                'L3Psi': R(Psi, 2),
+                'L3PsiPhi': R(Psi[:, None] * Phi[None, :], 2),
+                'L3PsiPhiPhi': R(Psi[:, None, None] * Phi[None, :, None] * Phi[None, None, :], 2)}
+
+    # DEIM point selection (greedy). Returns the basis and the points
+    @staticmethod
+    def deim(U):
+        P = [np.argmax(np.abs(U[:, 0]))]
+        for l in range(1, U.shape[1]):
+            c = np.linalg.solve(U[P, :l], U[P, l])
+            r = U[:, l] - np.dot(U[:, :l], c)
+            P.append(np.argmax(np.abs(r)))
+        return U, np.array(P)
+
+    # Exit values of the operators for the current geometry of the regions,
+    # same keys as nlLeakageFlow2D.endKernel. Returns None if the
+    # interpolation error is larger than the tolerance
+    def evaluate(self):
+        rho = self._rho
+        g = []
+        e = {key: np.zeros(len(self._regions)) for key in
+             ['s0', 'sL', 'dsi0', 'dsiL', 'Wt1', 'Wtdd', 'c0', 'c1', 'c2', 'v0', 'v1', 'v2']}
+        for i, r in enumerate(self._regions):
+            # Modal coordinates of the beam (as in eigen.reconstruct, the
+            # leading entries are the coordinates of the modes)
+            beam = r['beam']
+            n = r['PhiL'].size
+            a = np.asarray(beam.a, dtype=float)[:n]
+            da = np.asarray(beam.da, dtype=float)[:n]
+            dda = np.asarray(beam.dda, dtype=float)[:n]
+            sign = r['sign']
+            s = r['sRest'] + sign * np.dot(a, r['phi'])
+            gs = [1 / s, 1 / s ** 2, 1 / s ** 3]
+            gP = [gs[p][r['P'][p]] for p in range(3)]
+            # Interpolation error at the validation points
+            for p in range(3):
+                gv = gs[p][r['V'][p]]
+                if np.max(np.abs(np.dot(r['Bv'][p], gP[p]) - gv) / np.abs(gv)) > self._tolerance:
+                    self.fallbacks += 1
+                    self._g = None
+                    return None
+            s0, sL = s[r['end'][0]], s[r['end'][1]]
+            dsiL = sign * np.dot(da, r['PhiL'])
+            e['s0'][i] = s0
+            e['sL'][i] = sL
+            e['dsiL'][i] = dsiL
+            e['Wt1'][i] = rho * np.dot(r['R1'], gP[0])
+            e['Wtdd'][i] = rho * sign * np.dot(dda, np.dot(r['R1Phi'], gP[0]))
+            e['c0'][i] = 0.5 * rho * (1 / sL ** 2 - 1 / s0 ** 2)
+            e['c1'][i] = 0.5 * rho * (sign * np.dot(da, np.dot(r['R2phi'], gP[1])) + dsiL / sL ** 2)
+            e['c2'][i] = rho * (np.dot(da, np.dot(np.dot(r['R2Phiphi'], gP[1]), da)) + 0.5 * dsiL ** 2 / sL ** 2)
+            e['v0'][i] = np.dot(r['R3'], gP[2])
+            e['v1'][i] = sign * np.dot(da, np.dot(r['R3Phi'], gP[2]))
+            e['v2'][i] = np.dot(da, np.dot(np.dot(r['R3PhiPhi'], gP[2]), da))
+            g.append((gP, s0, da, dda))
+        self.evaluations += 1
+        self._g = g
+        return e
+
+    # Modal projections int(phi_j deltaPx) of the pressure difference for the
+    # flow state (pIn - inlet loss, dQ0, Q0, xix, f0 of each region) on the
+    # last evaluated geometry
+    def modalLoad(self, A, dQ0, Q0, xix, f0, pSign):
+        rho = self._rho
+        f = 0
+        for i, r in enumerate(self._regions):
+            gP, s0, da, dda = self._g[i]
+            sign = r['sign']
+            q = Q0[i]
+            PWt1 = rho * np.dot(r['L1Psi'], gP[0])
+            PWtdd = rho * sign * np.dot(np.dot(r['L1PsiPhi'], gP[0]), dda)
+            Pc0 = 0.5 * rho * (np.dot(r['R2phi'], gP[1]) - r['PhiL'] / s0 ** 2)
+            Pc1 = 0.5 * rho * sign * np.dot(np.dot(r['L2S'], gP[1]), da)
+            Pc2 = rho * np.dot(np.dot(np.dot(r['L2T'], gP[1]), da), da)
+            Pv0 = np.dot(r['L3Psi'], gP[2])
+            Pv1 = sign * np.dot(np.dot(r['L3PsiPhi'], gP[2]), da)
+            Pv2 = np.dot(np.dot(np.dot(r['L3PsiPhiPhi'], gP[2]), da), da)
+            f = f + pSign[i] * (A[i] * r['PhiL'] - dQ0[i] * PWt1 + PWtdd
+                                - xix[i] * (q ** 2 * Pc0 - 2 * q * Pc1 + Pc2)
+                                - 0.25 * f0[i] * (q ** 2 * Pv0 - 2 * q * Pv1 + Pv2))
+        return f
+
+    # True if the current geometry was evaluated with the reduced operators
+    def active(self):
+        return self._g is not None
+
+    def info(self):
+        print("---> Reduced flow model: reduced evaluations", self.evaluations,
+              "full model fallbacks", self.fallbacks)
@@ -13,7 +13,8 @@
 #   Local Re is the same for all regions. Not as above Eq. 2.30
 #   eta calculation must be checked
 #   Check the consideration of the beam thickness (hardcoded to 1)
-#   Only two regions allowed
+#   Any number of regions, the regions without flexible boundary do not
+#   load the solid
 #   Regions has just one flexible boundary
 #   Inconsistency: self._control['bc']['inlet']['zeta'] is the same for regions
 # --------------------------------------------------------------------------- #
@@ -21,12 +22,13 @@
 from abc import ABC
 import numpy as np
 import scipy.integrate as si
+import scipy.sparse as sp
 
 from pyFSI.mesh.region.fsiRegion1D import fsiRegion1D
 from pyFSI.models.flowModels.flowBase import flowModel
+from pyFSI.models.flowModels.leakageFlowROM import leakageFlowROM
 from pyFSI.models.properties.boundaryLayer import boundaryLayer
 from pyFSI.vectors.eigen.eigenVector import eigenVector
-from pyFSI.models.properties.dimensionlessNumbers import ReynoldsNumber
 from pyFSI.fields.boundary import boundaryConditions
 
 class nlLeakageFlow2D(flowModel, ABC):
@@ -37,17 +39,15 @@ class nlLeakageFlow2D(flowModel, ABC):
         super().__init__(execution, control, mesh, boundary, time)
 
         # ----- Public attributes ----- #
-        self.dof = 2  # Number of Q equations (1 per region)
+        self.dof = len(self.regions)  # Number of Q equations (1 per region)
         self.Q0 = np.zeros(self.dof)
         self.v0 = np.zeros(self.dof)
         self.dQ0 = np.zeros(self.dof)
-        self.Q = np.zeros(self.dof, dtype=object)
-        self.dQ = np.zeros(self.dof, dtype=object)
-        self.px = np.zeros(self.dof, dtype=object)
-        self.deltaPx = np.zeros(1, dtype=object)
-        self.Forces = np.zeros((mesh.size*2, 3))  # The 3D Forces
+        self.Q = np.zeros((self.dof, mesh.size))  # Region data is stored as (region, node)
+        self.dQ = np.zeros((self.dof, mesh.size))
         self.Dp = None  # pOut - pIn
         self.converged = [False] * self.dof
+        self.rom = None  # Reduced operators (see leakageFlowROM)
         # Output variable mapping
         self.varMap["flowRates"] = "Q0"
         self.varMap["pressures"] = "px"
@@ -62,6 +62,26 @@ class nlLeakageFlow2D(flowModel, ABC):
         self._zetaIn = None  # Inlet loss factor
         self._zetaOut = None  # Outlet loss factor
         self._pTol = 1E-4  # Pressure convergence tolerance
+        self._kernel = None  # Geometric integrals of the operators
+        self._end = None  # Exit values of the operators (see endKernel)
+        self._loadKey = None  # State key of the modal load
+        self._load = None  # Modal projections of the pressure difference
+        # Pressures and forces are computed on demand (see pressures()) for
+        # the current state, which is identified by its key
+        self._state = 0  # Counter of the flow state updates
+        self._rhsKey = None  # State key of the last rhs
+        self._pxKey = None  # State key of the pressures
+        self._forcesKey = None  # State key of the forces
+        self._px = np.zeros((self.dof, mesh.size))
+        self._deltaPx = np.zeros((1, mesh.size))
+        self._Forces = np.zeros((mesh.size*2, 3))  # The 3D Forces
+        # Friction model, "discontinuous" (default) or "blended" with a
+        # relative transition "width" around Rd = 1000
+        self._friction = {'type': 'discontinuous', 'width': 0.1}
+        if 'friction' in self._control:
+            self._friction.update(self._control['friction'])
+        self._data = {}  # Stacked region data
+        self._dataVersion = None  # Region versions of the stacked data
         # self._f0 = np.zeros(self.dof)  # Viscous friction factor
         # self._xix = np.zeros(self.dof)  # Nonlinear profile factor
         # self._eta = np.zeros(self.dof)  # Derivative of f(Qx) at qx0
@@ -72,7 +92,12 @@ class nlLeakageFlow2D(flowModel, ABC):
         self.f0 = np.zeros(self.dof)
         self.xix = np.zeros(self.dof)
         self.eta = np.zeros(self.dof)
-        self.Rd = [None] * self.dof  # Emtpy list of Reynolds objects
+        self.dxix = np.zeros(self.dof)  # Derivative of xix (blended friction)
+        self.Rd = np.zeros(self.dof)  # Reynolds number of each region
+        # Sign of each region pressure in the pressure difference, it is the
+        # sign of the flexible boundary motion in the region size (the
+        # pressure of a region over the boundary pushes it down)
+        self._pSign = np.array([float(region.flexSign()) for region in self.regions])
         # Size of the associated eigensystem
         # self._gDof = self.regions[0].eigen().size
 
@@ -99,41 +124,113 @@ class nlLeakageFlow2D(flowModel, ABC):
         self._zetaOut = self._zetaOutBC.getValue(0)
         self._zetaIn = self._zetaInBC.getValue(0)
 
-        # Initialize the flow rate
-        L = -1
-        convergence = [False, False]
+        # Initialize the flow rate. The steady flow rate of each region solves
+        #   g(Q0) = Dp + Q0**2 * (tio + Wc(1)[L] + Wv(1)[L]) = 0
+        # by Newton iterations (the friction derivative enters through eta),
+        # safeguarded by bisection in a bracket [Qlo, Qhi] with g(Qlo) < 0 < g(Qhi)
         Qtol = 1E-10
-        Q0old = self.Q0.copy()  # Old values, copied, otherwise we point to the same
         for region in self.regions:
             region.update()
-        self.constants()  # Initialize the flow constants
-        for i in range(50):
-            # print('Starting initial condition iteration: ', i + 1)
-            for r, region in enumerate(self.regions):
-                tio = 0.5 * self._fluid['rho'] * (self._zetaIn / region.data['s'][0] ** 2 +
-                                                  self._zetaOut / region.data['s'][L] ** 2)
-                tcv = self.Wc(r, 1, region)[L] + self.Wv(r, 1, region)[L]
-
-                self.Q0[r] = np.sqrt(-self.Dp / (tio + tcv))  # New Q0
+        if 'rom' in self._control:
+            self.rom = leakageFlowROM(self, self._control['rom'])
+        e = self.endKernel()
+        tio = 0.5 * self._fluid['rho'] * (self._zetaIn / e['s0'] ** 2 + self._zetaOut / e['sL'] ** 2)
+        c = e['c0']  # Wc(1)[L] / xix
+        v = e['v0']  # Wv(1)[L] / (0.25 * f0)
 
-                self.constants()  # Constants for the new Q0
+        def steady(Q):
+            f0, xix, eta, dxix = self.friction(Q)
+            t = tio + xix * c + 0.25 * f0 * v
+            return self.Dp + Q ** 2 * t, 2 * Q * t + (dxix * c + 0.25 * eta * v) * Q ** 2
 
-                if (np.abs(self.Q0[r] - Q0old[r])) / np.abs(self.Q0[r]) < Qtol:
-                    convergence[r] = True
-
-            Q0old = self.Q0.copy()
+        # Frictionless first guess and bracket
+        Q = np.sqrt(-self.Dp / tio)
+        Qlo = np.zeros(self.dof)
+        Qhi = Q.copy()
+        for i in range(60):
+            g, dg = steady(Qhi)
+            if np.all(g > 0):
+                break
+            Qhi = np.where(g > 0, Qhi, 2 * Qhi)
 
-            # print('Current Q0 is: ', self.Q0)
-            # Check convergence of both regions
-            if convergence[0] and convergence[1]:
-                print("---> Initial Q0 has converged to: ", self.Q0, '. Iterations: ', i)
+        converged = False
+        for i in range(50):
+            g, dg = steady(Q)
+            Qlo = np.where(g < 0, Q, Qlo)
+            Qhi = np.where(g > 0, Q, Qhi)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                Qn = Q - g / dg
+            bisect = ~((Qn >= Qlo) & (Qn <= Qhi))  # Newton step out of the bracket
+            Qn[bisect] = 0.5 * (Qlo[bisect] + Qhi[bisect])
+            change = np.abs(Qn - Q) / np.abs(Qn)
+            Q = Qn
+            if np.all(change < Qtol):
+                converged = True
                 break
 
-        if not convergence[0] and not convergence[1]:
+        self.Q0 = Q
+        self._ti = self._time.value
+        self._state += 1
+        self.constants()  # Constants for the new Q0
+        if converged:
+            print("---> Initial Q0 has converged to: ", self.Q0, '. Iterations: ', i)
+        else:
             raise ValueError("     ERROR: The fluid initial condition has not converged!")
 
+    # Friction factor (f0), nonlinear profile factor (xix) and their
+    # derivatives (eta and dxix) for the flow rates Q0 of the regions. The
+    # regimes switch at Rd = 1000 (laminar-turbulent) and Rd = 1 (no flow).
+    # The blended model joins them with C1 smoothsteps:
+    #   no flow-laminar over 1 < Rd < 2
+    #   laminar-turbulent over 1000/(1+w) < Rd < 1000*(1+w) (in log Rd)
+    def friction(self, Q0, Rd=None):
+        nu = self._fluid['mu'] / self._fluid['rho']
+        if Rd is None:
+            Rd = Q0 / nu
+        if self._friction['type'] == 'blended':
+            return self.blendedFriction(Rd, nu)
+        laminar = Rd < 1000
+        noFlow = Rd <= 1  # Set the no flow values to zero to avoid indetermination
+        Rd = np.maximum(Rd, 1.0)
+        Q = np.where(noFlow, 1.0, Q0)
+        f0 = np.where(laminar, 48.0 / Rd, 0.26 * Rd ** -0.24)
+        xix = np.where(laminar, 6.0 / 5.0, 1.0)
+        eta = np.where(laminar, -f0 / Q, -0.24 * f0 / Q)
+        f0[noFlow] = 0
+        xix[noFlow] = 0
+        eta[noFlow] = 0
+        return f0, xix, eta, np.zeros_like(xix)  # xix is constant in each regime
+
+    def blendedFriction(self, Rd, nu):
+        w = self._friction['width']
+        R = np.maximum(Rd, 1.0)
+        # Smoothstep weights and their derivatives with respect to Rd
+        u0 = np.clip(Rd - 1.0, 0.0, 1.0)
+        b0 = u0 ** 2 * (3 - 2 * u0)
+        db0 = 6 * u0 * (1 - u0)
+        lo = np.log(1000.0 / (1 + w))
+        width = 2 * np.log(1 + w)
+        u1 = np.clip((np.log(R) - lo) / width, 0.0, 1.0)
+        b1 = u1 ** 2 * (3 - 2 * u1)
+        db1 = 6 * u1 * (1 - u1) / (width * R)
+        # Laminar and turbulent friction factors and derivatives
+        fl = 48.0 / R
+        dfl = -fl / R
+        ft = 0.26 * R ** -0.24
+        dft = -0.24 * ft / R
+        fm = (1 - b1) * fl + b1 * ft
+        dfm = (1 - b1) * dfl + b1 * dft + db1 * (ft - fl)
+        xm = (1 - b1) * 6.0 / 5.0 + b1
+        dxm = db1 * (1.0 - 6.0 / 5.0)
+        f0 = b0 * fm
+        xix = b0 * xm
+        eta = (db0 * fm + b0 * dfm) / nu  # d/dQ0 = d/dRd / nu
+        dxix = (db0 * xm + b0 * dxm) / nu
+        return f0, xix, eta, dxix
+
     def update(self,  time, state):
         self._ti = time
+        self._state += 1
         # Update the flow rate and the dimensionless numbers
         self.Q0 = state  # Update the flow rate
         self.constants()
@@ -143,104 +240,292 @@ class nlLeakageFlow2D(flowModel, ABC):
         self.Dp = self._pOut - self._pIn
         self._zetaIn = self._zetaInBC.getValue(time)
         self._zetaOut = self._zetaOutBC.getValue(time)
-        # Update the regions and the operators
-        for i, region in enumerate(self.regions):
-            self.Q[i] = self.Q0[i] - region.data['dsi']
-            self.v0[i] = self.Q0[i] / region.data['s'][0]
+        # Update the inlet speed
+        self.v0 = self.Q0 / self.endKernel()['s0']
 
+    # The forces are computed on demand from the pressures (see Forces)
     def updateForces(self, time):
-        # Force calculation for Calculix coupling
-        force = np.zeros(1, dtype=object)
-        force = -(self.px[0] - self.px[1])
-        # Integrate the pressure to obtain the force on every node
-        F_half = 0.5 * si.cumtrapz(force, self._mesh.x, initial=0.0)
-        self.Forces[0:self._mesh.size, 1] = F_half
-        self.Forces[self._mesh.size:self._mesh.size*2, 1] = F_half
-
-    # Evaluate the RHS ofthe equation
+        pass
+
+    # Pressure distribution of each region for the current state
+    @property
+    def px(self):
+        self.pressures()
+        return self._px
+
+    # Pressure difference between the top and bottom
+    @property
+    def deltaPx(self):
+        self.pressures()
+        return self._deltaPx
+
+    # Force calculation for Calculix coupling
+    @property
+    def Forces(self):
+        self.pressures()
+        if self._forcesKey != self._pxKey:
+            force = self._deltaPx[0]  # Pressure difference on the flexible boundaries
+            # Integrate the pressure to obtain the force on every node
+            F_half = 0.5 * si.cumtrapz(force, self._mesh.x, initial=0.0)
+            self._Forces[0:self._mesh.size, 1] = F_half
+            self._Forces[self._mesh.size:self._mesh.size*2, 1] = F_half
+            self._forcesKey = self._pxKey
+        return self._Forces
+
+    # Key of the current state, it changes with every update and geometry change
+    def stateKey(self):
+        return self._state, self.geometryVersion()
+
+    def numbersKey(self):
+        return self.stateKey()
+
+    # Evaluate the RHS ofthe equation, all the regions at once. Only the end
+    # values of the operators are needed for dQ0, the pressures are computed
+    # later if they are requested for this state
     def rhs(self, time, state):
-        rhs = np.zeros(self.dof)
-        L = -1  # Index of the end of the channel
         self.update(time, state)
-        # Assemble the rhs of each region
-        deltaPx = np.zeros(1, dtype=object) # Pressure difference between the regions
+        rho = self._fluid['rho']
+        e = self.endKernel()
+
+        t2 = 0.5 * rho * (self._zetaIn * ((self.Q0 - e['dsi0']) / e['s0']) ** 2
+                          + self._zetaOut * ((self.Q0 - e['dsiL']) / e['sL']) ** 2)
+
+        t4 = - e['Wtdd']  # Old value of acceleration
+
+        rhs = -(1 / e['Wt1']) * (self.Dp + t2 + self.Wcv(e) + t4)
+
+        # Update the acceleration (is this, the RHS)
+        self.dQ0[:] = rhs
+        self._rhsKey = self.stateKey()
+
+        return rhs
+
+    # Pressure distribution and pressure difference of the current state. The
+    # rhs is evaluated first if dQ0 does not belong to the current state
+    def pressures(self):
+        if self._pxKey == self.stateKey():
+            return
+        if self._rhsKey != self.stateKey():
+            self.rhs(self._ti, self.Q0)
+        rho = self._fluid['rho']
+        k = self.kernel()
+        s = k['s']
+        self.Q = self.Q0[:, None] - self.regionData('dsi')
+        self.dQ = self.dQ0[:, None] - k['ddsi']
+        # Correct the pressure for the new acceleration, Wt(dQ) = dQ0 Wt(1) - Wt(ddsi)
+        self._px = ((self._pIn
+                     - rho * 0.5 * self._zetaIn * (self.Q0 / s[:, 0]) ** 2)[:, None]
+                    - (self.dQ0[:, None] * k['Wt1'] - k['Wtdd'])
+                    - self.Wcv(k))
+
+        # Update the pressure difference between the top and bottom
+        self._deltaPx = np.sum(self._pSign[:, None] * self._px, axis=0, keepdims=True)
+        self._pxKey = self.stateKey()
+
+    # Analytic Jacobian of the rhs. The flow rate of each region only depends
+    # on its own Q0, so the Jacobian is diagonal (eta and dxix are the
+    # derivatives of f0 and xix, nonzero in the blends of the blended friction)
+    def jac(self, time, state):
+        return np.diag(self.jacDiagonal(time, state))
+
+    def jacSparse(self, time, state):
+        return sp.diags(self.jacDiagonal(time, state), format='csc')
+
+    def jacDiagonal(self, time, state):
+        self.update(time, state)
+        rho = self._fluid['rho']
+        e = self.endKernel()
+        q = self.Q0
+        dt2 = rho * (self._zetaIn * (q - e['dsi0']) / e['s0'] ** 2
+                     + self._zetaOut * (q - e['dsiL']) / e['sL'] ** 2)
+        # Derivatives of Wc(Q**2) and Wv(Q**2) and the integral of Q**2/s**3 at the exit
+        dWc = (2 * self.xix * (q * e['c0'] - e['c1'])
+               + self.dxix * (q ** 2 * e['c0'] - 2 * q * e['c1'] + e['c2']))
+        dWv = 0.5 * self.f0 * (q * e['v0'] - e['v1'])
+        iQ2 = q ** 2 * e['v0'] - 2 * q * e['v1'] + e['v2']
+        return -(1 / e['Wt1']) * (dt2 + dWc + dWv + 0.25 * self.eta * iQ2)
+
+    # Derivatives of the pressure difference with respect to the flow rates,
+    # row i is d(deltaPx)/dQ0[i]. The pressure of each region depends on its
+    # Q0 through the inlet loss, dQ0 (see jac) and the operators Wcv
+    def pressureJac(self, time, state):
+        dQ = self.jacDiagonal(time, state)
+        rho = self._fluid['rho']
+        k = self.kernel()
+        s0 = k['s'][:, 0]
+        q = self.Q0[:, None]
+        dWcv = (2 * self.xix[:, None] * (q * k['c0'] - k['c1'])
+                + self.dxix[:, None] * (q ** 2 * k['c0'] - 2 * q * k['c1'] + k['c2'])
+                + 0.5 * self.f0[:, None] * (q * k['v0'] - k['v1'])
+                + 0.25 * self.eta[:, None] * (q ** 2 * k['v0'] - 2 * q * k['v1'] + k['v2']))
+        dpx = (-(rho * self._zetaIn * self.Q0 / s0 ** 2)[:, None]
+               - dQ[:, None] * k['Wt1']
+               - dWcv)
+        return self._pSign[:, None] * dpx
+
+    # Fused convective and viscous operators on Q**2 = (Q0 - dsi)**2. Both are
+    # linear in fx, so they are combinations of the geometric integrals. They
+    # are evaluated on the distributions (kernel) or the exit values (endKernel)
+    def Wcv(self, k):
+        shape = (self.dof,) + (1,) * (k['c0'].ndim - 1)
+        q = self.Q0.reshape(shape)
+        q2 = q ** 2
+        return (self.xix.reshape(shape) * (q2 * k['c0'] - 2 * q * k['c1'] + k['c2'])
+                + 0.25 * self.f0.reshape(shape) * (q2 * k['v0'] - 2 * q * k['v1'] + k['v2']))
+
+    # Exit values of the operators for the current geometry, from the reduced
+    # operators if they are available and accurate, else from the kernel
+    def endKernel(self):
+        version = self.geometryVersion()
+        if self._end is not None and self._end['version'] == version:
+            return self._end
+        e = None
+        if self.rom is not None:
+            e = self.rom.evaluate()
+        if e is None:
+            L = -1
+            k = self.kernel()
+            dsi = self.regionData('dsi')
+            e = {'s0': k['s'][:, 0], 'sL': k['s'][:, L], 'dsi0': dsi[:, 0], 'dsiL': dsi[:, L]}
+            for key in ['Wt1', 'Wtdd', 'c0', 'c1', 'c2', 'v0', 'v1', 'v2']:
+                e[key] = k[key][:, L]
+        e['version'] = version
+        self._end = e
+        return e
+
+    # Modal projections int(phi_j deltaPx) of the pressure difference of the
+    # current state with the reduced operators. None if they are not in use
+    def modalLoad(self):
+        if self.rom is None:
+            return None
+        if self._loadKey == self.stateKey():
+            return self._load
+        if self._rhsKey != self.stateKey():
+            self.rhs(self._ti, self.Q0)
+        e = self.endKernel()
+        self._load = None
+        if self.rom.active():
+            A = self._pIn - self._fluid['rho'] * 0.5 * self._zetaIn * (self.Q0 / e['s0']) ** 2
+            self._load = self.rom.modalLoad(A, self.dQ0, self.Q0, self.xix, self.f0, self._pSign)
+        self._loadKey = self.stateKey()
+        return self._load
+
+    # Cumulative integrals that only depend on the region geometry. They are
+    # computed once for each geometry and reused by all the rhs evaluations:
+    #   Wt1 = Wt(1), Wtdd = Wt(ddsi)
+    #   c0, c1, c2 = Wc(1), Wc(dsi), Wc(dsi**2) without xix
+    #   v0, v1, v2 = int(1/s**3), int(dsi/s**3), int(dsi**2/s**3)
+    # The regions with linear size at rest (dsi = ddsi = 0) are integrated in
+    # closed form, Wc(1) = (1/s**2 - 1/s0**2)/2 and the dsi terms vanish
+    def kernel(self):
+        version = self.geometryVersion()
+        if self._kernel is not None and self._kernel['version'] == version:
+            return self._kernel
+        s = self.regionData('s')
+        dsi = self.regionData('dsi')
+        ddsi = self.regionData('ddsi')
+
+        x = self._mesh.x
+        rho = self._fluid['rho']
+        linear = np.array([region.line is not None for region in self.regions])
+        c = np.zeros((8,) + s.shape)
+        if not np.all(linear):
+            q = ~linear
+            i1 = 1 / s[q]
+            i3 = i1 / s[q] ** 2
+            dsi2 = dsi[q] ** 2
+            c[:, q] = si.cumtrapz(np.array([i1, ddsi[q] * i1,
+                                            i1 * np.gradient(i1, x, axis=-1, edge_order=2),
+                                            i1 * np.gradient(dsi[q] * i1, x, axis=-1, edge_order=2),
+                                            i1 * np.gradient(dsi2 * i1, x, axis=-1, edge_order=2),
+                                            i3, dsi[q] * i3, dsi2 * i3]), x, initial=0)
+        for i in np.flatnonzero(linear):
+            region = self.regions[i]
+            c[0, i] = region.inverseSizeIntegral(1)
+            c[2, i] = 0.5 * (1 / s[i] ** 2 - 1 / s[i, 0] ** 2)
+            c[5, i] = region.inverseSizeIntegral(3)
+        self._kernel = {'version': version, 's': s, 'ddsi': ddsi,
+                        'Wt1': rho * c[0], 'Wtdd': rho * c[1],
+                        'c0': rho * c[2], 'c1': rho * c[3], 'c2': rho * c[4],
+                        'v0': c[5], 'v1': c[6], 'v2': c[7]}
+        return self._kernel
+
+    # Response of the flow to unit modal accelerations of the flexible boundaries.
+    # The rhs is linear in ddsi, so the flow rate accelerations and the pressure
+    # difference for a given set of modal accelerations dda are
+    #   dQ0 = dQ0(ddsi=0) + dQa . dda,  deltaPx = deltaPx(ddsi=0) + dda . dPa
+    def addedMass(self):
+        L = -1
+        nModes = next(region.eigen().size for region in self.regions if region.flexSign() != 0)
+        dQa = np.zeros((self.dof, nModes))
+        dPa = np.zeros((nModes, self._mesh.size))
         for i, region in enumerate(self.regions):
+            if region.flexSign() == 0:  # Rigid region
+                continue
             s = region.data['s']
-            dsi = region.data['dsi']
-
-            t2 = 0.5 * self._fluid['rho'] * (
-                      self._zetaIn * (self.Q[i][0] / s[0]) ** 2
-                      + self._zetaOut * (self.Q[i][L] / s[L]) ** 2)
-
-            Wcv = (self.Wc(i, self.Q[i]**2, region)
-                   + self.Wv(i, self.Q[i]**2, region))
-
-            t4 = - self.Wt(i, region.data['ddsi'], region)[L]  # Old value of acceleration
-
-            rhs[i] = -(1 / self.Wt(i, 1, region)[L]) * (self.Dp + t2 + Wcv[L] + t4)
-
-            # Update the acceleration (is this, the RHS)
-            self.dQ0[i] = rhs[i]
-            self.dQ[i] = self.dQ0[i] - region.data['ddsi']
-            # Correct the pressure for the new acceleration
-            self.px[i] = (self._pIn
-                          - self._fluid['rho'] * 0.5 * self._zetaIn * (self.Q0[i] / region.data['s'][0]) ** 2
-                          - self.Wt(i, self.dQ[i], region)
-                          - Wcv)
-            # print('exit pressure: ', self.px[i][-1])
-            if region.type == 'top':
-                sign = -1
-            else:
-                sign = 1
-            deltaPx[0] += sign * self.px[i]
+            Wt1 = self.Wt(1, s)
+            for k in range(nModes):
+                Wtk = self.Wt(region.flexSign() * region.eigen().ix[k], s)
+                dQa[i, k] = Wtk[L] / Wt1[L]
+                dPa[k] += self._pSign[i] * (Wtk - dQa[i, k] * Wt1)
+        return dQa, dPa
 
-        # Update the pressure difference between the top and bottom
-        self.deltaPx = deltaPx
+    # Versions of the region geometries
+    def geometryVersion(self):
+        return tuple(region.version for region in self.regions)
 
-        return rhs
+    # Region data stacked as a (region, node) array, stored until the geometry changes
+    def regionData(self, key):
+        version = self.geometryVersion()
+        if version != self._dataVersion:
+            self._data = {}
+            self._dataVersion = version
+        if key not in self._data:
+            self._data[key] = np.array([region.data[key] for region in self.regions])
+        return self._data[key]
 
     # ----- Flow Operators ----- #
+    # The transient operator integrates along the last axis, so size and fx
+    # can be the data of one region or the stacked data of all the regions.
+    # The convective and viscous operators are fused in the kernel (see Wcv)
     # Transient Operator
-    def Wt(self, i, fx, region):
-        size = region.data['s']
+    def Wt(self, fx, size):
         Wt = self._fluid['rho'] * si.cumtrapz(fx / size, self._mesh.x, initial=0)
         return Wt
 
-    # Convective Operator
-    def Wc(self, i, fx, region):
-        size = region.data['s']
-        wc = si.cumtrapz((1/size) * np.gradient(fx / size, self._mesh.x, edge_order=2),
-                          self._mesh.x, initial=0)
-        Wc = self._fluid['rho'] * self.xix[i] * wc
-        return Wc
-
-    # Viscous Operator
-    def Wv(self, i, fx, region):
-        size = region.data['s']
-        Wv = 0.25 * self.f0[i] * si.cumtrapz(fx / size**3, self._mesh.x, initial=0)
-        return Wv
-
     # Calculate some constants
+    # Reference values and friction factors of the regions. Only the scalar
+    # values needed by the equations are computed here, the dimensionless
+    # numbers are calculated when requested (see dimNumbers)
     def constants(self):
-        self.calcNumbers()
-        for i, region in enumerate(self.regions):
-            self.dRef[i] = region.data['s'][0]  # Reference channel size
-            self.eRef[i] = self.dRef[i] / self.lRef
-            self.vRef[i] = self.Q0[i] / self.dRef[i]
-            self.Rd[i] = ReynoldsNumber(self, L=self.dRef[i], V=self.vRef[i])
-            if self.Rd[i].value < 1000:  # Laminar
-                if self.Rd[i].value <= 1: # Set the no flow values to zero to avoid indetermination
-                    self.f0[i] = 0
-                    self.xix[i] = 0
-                    # self.eta = -0
-                else: # Laminar values
-                    self.f0[i] = 48.0 / self.Rd[i].value
-                    self.xix[i] = 6.0 / 5.0
-                    # self.eta = -self.f0 / Q0
-            else:  # Turbulent
-                self.f0[i] = 0.26 * self.Rd[i].value ** -0.24
-                self.xix[i] = 1.0
-                # self.eta = -(0.0624 * self.Rd.value ** -0.24) / Q0
+        self.dRef[:] = self.endKernel()['s0']  # Reference channel size
+        np.divide(self.dRef, self.lRef, out=self.eRef)
+        np.divide(self.Q0, self.dRef, out=self.vRef)
+        np.multiply(self._fluid['rho'], self.vRef, out=self.Rd)
+        self.Rd *= self.dRef
+        self.Rd /= self._fluid['mu']
+        self.f0, self.xix, self.eta, self.dxix = self.friction(self.Q0, self.Rd)
+
+    # Terminal events at the friction regime switches of the flow rates in
+    # y[offset:offset + dof], used to restart the integrators at the switch.
+    # Thresholds where y0 already sits are left out. Empty for the blended model
+    def regimeEvents(self, y0, offset=0):
+        events = []
+        if self._friction['type'] == 'blended':
+            return events
+        nu = self._fluid['mu'] / self._fluid['rho']
+        for i in range(self.dof):
+            for Rd in [1.0, 1000.0]:
+                if abs(y0[offset + i] / nu - Rd) > 1E-9 * Rd:
+                    events.append(self._regimeEvent(offset + i, Rd * nu))
+        return events
+
+    @staticmethod
+    def _regimeEvent(i, Qc):
+        def event(t, y):
+            return y[i] - Qc
+        event.terminal = True
+        return event
 
     def calcNumbers(self):
         super().calcNumbers()
\ No newline at end of file
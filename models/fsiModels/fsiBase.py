@@ -10,7 +10,8 @@ class fsiBase(ABC):
         self.name = control['name']
         self.path = execution['paths']['fsiPath']  # Associated path
         self.output = []
-        self.dimNumbers = {}  # Dimensionless numbers
+        self._dimNumbers = {}  # Dimensionless numbers (see dimNumbers)
+        self._numbersKey = None  # Flow state key of the dimensionless numbers
         self.varMap = {
             "numbers": "dimNumbers"
         }
@@ -27,9 +28,19 @@ class fsiBase(ABC):
             self._debug = False
 
     def calcNumbers(self):
-        self.dimNumbers["Cy"] = CauchyNumber(self)
-        self.dimNumbers["Ms"] = massNumber(self)
-        self.dimNumbers["Vr"] = reducedVelocityNumber(self)
+        self._dimNumbers["Cy"] = CauchyNumber(self)
+        self._dimNumbers["Ms"] = massNumber(self)
+        self._dimNumbers["Vr"] = reducedVelocityNumber(self)
+
+    # The dimensionless numbers are calculated when requested (output and
+    # information) and kept while the flow state does not change
+    @property
+    def dimNumbers(self):
+        key = self._flow.numbersKey()
+        if key is None or key != self._numbersKey:
+            self.calcNumbers()
+            self._numbersKey = key
+        return self._dimNumbers
 
     # Getters
     def control(self):
@@ -1,7 +1,8 @@
 # Change the system matrix.
 # Corrected the position of G, Small acceleration and changed the sign of Tb
 import copy
-import numpy as np, scipy.integrate as si
+import sys
+import numpy as np, scipy.linalg as sl
 
 from pyFSI.vectors.eigen import eigenSystem as es
 from pyFSI.models.fsiModels.fsiBase import fsiBase
@@ -14,40 +15,49 @@ class lfb1D(fsiBase):
 
     def __init__(self, execution, control, solid, flow, time):
         super().__init__(execution, control, solid, flow, time)
-        if self._debug:
-            print("     WARNING: Region names are hardcoded.")
+
+        # Regions of the flow equations, the ones whose flexible boundary is
+        # the top boundary (bottom regions) first, in the order of the input.
+        # Two regions give the usual bottom-top system
+        self._regions = sorted(flow.regions, key=lambda region: -region.flexSign())
+        self._signs = np.array([region.flexSign() for region in self._regions])
+        if np.any(self._signs == 0):
+            sys.exit("ERROR: The lfb1D model needs a flexible boundary in every region")
+        if control['type'] == "Tosi" and len(self._regions) != 2:
+            sys.exit("ERROR: The Tosi formulation needs exactly two regions")
 
         # Size of the state-space eigen matrix
         esize = solid.eigen.size
         self._esize = esize
-        self._size = self._esize * 2 + 2
+        self._size = self._esize * 2 + len(self._regions)
 
         # Initialize the system matrices
         self.K = np.zeros((esize, esize))  # Mass
         self.C = np.zeros((esize, esize))  # Damping
         self.M = np.zeros((esize, esize))  # Stiffness
-        self.Tb = np.zeros(esize)
-        self.Tt = np.zeros(esize)
-        self.Bb = np.zeros(esize)
-        self.Bt = np.zeros(esize)
-        self.Db = np.zeros(esize)
-        self.Dt = np.zeros(esize)
-        self.Eb = np.zeros(esize)
-        self.Et = np.zeros(esize)
-        self.Gt = None
-        self.Gb = None
+        # Region vectors, one row per region
+        self.T = np.zeros((len(self._regions), esize))
+        self.B = np.zeros((len(self._regions), esize))
+        self.D = np.zeros((len(self._regions), esize))
+        self.E = np.zeros((len(self._regions), esize))
+        self.G = np.zeros(len(self._regions))
         self.ES = es.eigenSystem([0], [0])  # Initialize the system to zero for correct file writing
+        self.ET = es.eigenSystem([0], [0])  # Tracked eigen system
+        self.trackingMAC = [1.0]  # MAC of the tracked modes between parametric steps
         self.norm = np.zeros((esize, esize))  # Eigenvector Norm
         self.S = np.zeros((self._size, self._size))  # System matrix
         # Output variables
         self.varMap["eigenValues"] = "ES.evalues()"
         self.varMap["eigenVectors"] = "ES.evectors()"
+        self.varMap["trackedEigenValues"] = "ET.evalues()"
+        self.varMap["trackedEigenVectors"] = "ET.evectors()"
+        self.varMap["trackingMAC"] = "trackingMAC"
 
 
     def update(self):
-        # Update the flow, the solid is not updated
+        # Update the flow, the solid is not updated (the dimensionless numbers
+        # are calculated when requested, see dimNumbers)
         self._flow.update()
-        self.calcNumbers()
         self.assemble()
 
     def assemble(self):
@@ -64,93 +74,87 @@ class lfb1D(fsiBase):
         #     for j in range(esize):
         #         self.norm[i, j] = si.simps(phiTphi[i, j], solid.mesh().x)
 
-        # Fill the system Matrices
-        for i in range(0, esize):
-            gi = solid.eigen.vectors[i]
-            ki = solid.k[i] + flow.k[i]
-            ci = solid.c[i] + flow.c[i]
-            mi = solid.m[i] + flow.m[i]
-
-            # Galerkin discretization
-            for j in range(0, esize):
-                gj = solid.eigen.vectors[j]
-                self.K[i, j] = -si.simps(ki * gj, solid.mesh().x)
-                self.C[i, j] = -si.simps(ci * gj, solid.mesh().x)
-                self.M[i, j] = si.simps(mi * gj, solid.mesh().x)
-
-        # System Region Vectors
-        self.Gt = flow.Gq['channelTop']
-        self.Gb = flow.Gq['channelBot']
-
-        # Galerkin discretization
-        for i in range(0, esize):
-            gi = solid.eigen.vectors[i]
-            self.Tt[i] = si.simps(flow.Tf['channelTop'] * gi, solid.mesh().x)
-            self.Tb[i] = si.simps(flow.Tf['channelBot'] * gi, solid.mesh().x)  # Changed the sign
-            self.Bt[i] = si.simps(flow.Bq['channelTop'] * gi, solid.mesh().x)
-            self.Bb[i] = si.simps(flow.Bq['channelBot'] * gi, solid.mesh().x)
-            self.Dt[i] = si.simps(flow.Dq['channelTop'] * gi, solid.mesh().x)
-            self.Db[i] = si.simps(flow.Dq['channelBot'] * gi, solid.mesh().x)
-            self.Et[i] = si.simps(flow.Eq['channelTop'] * gi, solid.mesh().x)
-            self.Eb[i] = si.simps(flow.Eq['channelBot'] * gi, solid.mesh().x)
-
-        # Mass products
-        Mi = np.linalg.inv(self.M)
-        MiDotC = np.dot(Mi, self.C)
-        MiDotK = np.dot(Mi, self.K)
-        MiDotTb = np.dot(Mi, self.Tb)
-        MiDotTt = np.dot(Mi, self.Tt)
+        # Galerkin discretization as weighted products with the Simpson weights
+        # of the mesh, int(f gj) = (f w).gj
+        x = solid.mesh().x
+        modes = np.array([np.asarray(g, dtype=float) for g in solid.eigen.vectors])
+        W = modes * solid.mesh().simpsonWeights()  # Weighted modes, one row per mode
+
+        # System matrices, row i is the projection of the vectors of mode i
+        def modal(s, f):
+            return np.array([np.broadcast_to(np.asarray(s[i] + f[i], dtype=float), x.shape)
+                             for i in range(esize)])
+
+        self.K = -np.dot(modal(solid.k, flow.k), W.T)
+        self.C = -np.dot(modal(solid.c, flow.c), W.T)
+        self.M = np.dot(modal(solid.m, flow.m), W.T)
+
+        # System Region Vectors, all the regions at once
+        def galerkin(vectors):
+            fx = np.array([np.broadcast_to(np.asarray(vectors[region.name], dtype=float), x.shape)
+                           for region in self._regions])
+            return np.dot(fx, W.T)
+
+        self.T = galerkin(flow.Tf)
+        self.B = galerkin(flow.Bq)
+        self.D = galerkin(flow.Dq)
+        self.E = galerkin(flow.Eq)
+        self.G = np.array([np.asarray(flow.Gq[region.name], dtype=float).item() for region in self._regions])
+
+        # Mass products, one LU factorisation of M solved against K, C and the
+        # region vectors together
+        lu = sl.lu_factor(self.M)
+        MiDot = sl.lu_solve(lu, np.hstack((self.K, self.C, self.T.T)))
+        MiDotK = MiDot[:, 0:esize]
+        MiDotC = MiDot[:, esize:2 * esize]
+        MiDotTu = MiDot[:, 2 * esize:]  # Mi.T of each region (columns)
+        MiDotT = MiDotTu.T * self._signs[:, None]  # Signed Mi.T of each region
 
         # System matrix
-        self.S[0:esize, esize:2*esize] = np.identity(esize)
-        self.S[esize:2*esize, 0:esize] = MiDotK
-        self.S[esize:2*esize, esize:2*esize] = MiDotC
-        self.S[esize:2*esize, 2*esize] = MiDotTb
-        self.S[esize:2*esize, 2*esize+1] = -MiDotTt
+        n = 2 * esize
+        self.S[0:esize, esize:n] = np.identity(esize)
+        self.S[esize:n, 0:esize] = MiDotK
+        self.S[esize:n, esize:n] = MiDotC
+        self.S[esize:n, n:] = MiDotT.T
 
         # Formulation considering acceleration terms
         if self._control['type'] == "Saravia":
-            self.S[2 * esize, 0:esize] = -self.Eb - np.dot(self.Bb, MiDotK)
-            self.S[2 * esize, esize:2 * esize] = -self.Db - np.dot(self.Bb, MiDotC)
-            self.S[2 * esize, 2 * esize] = self.Gb - np.dot(self.Bb, MiDotTb)
-            self.S[2 * esize, 2 * esize + 1] = np.dot(self.Bb, MiDotTt)
-
-            self.S[2 * esize + 1, 0:esize] = self.Et + np.dot(self.Bt, MiDotK)
-            self.S[2 * esize + 1, esize:2 * esize] = self.Dt + np.dot(self.Bt, MiDotC)
-            self.S[2 * esize + 1, 2 * esize] = np.dot(self.Bt, MiDotTb)
-            self.S[2 * esize + 1, 2 * esize + 1] = self.Gt - np.dot(self.Bt, MiDotTt)
+            self.S[n:, 0:esize] = -self._signs[:, None] * (self.E + np.dot(self.B, MiDotK))
+            self.S[n:, esize:n] = -self._signs[:, None] * (self.D + np.dot(self.B, MiDotC))
+            self.S[n:, n:] = np.diag(self.G) - self._signs[:, None] * np.dot(self.B, MiDotT.T)
 
         # Formulation not considering acceleration terms
         elif self._control['type'] == "SaraviaReduced":
-            self.S[2 * esize, 0:esize] = -self.Eb
-            self.S[2 * esize, esize:2 * esize] = -self.Db
-            self.S[2 * esize, 2 * esize] = self.Gb
+            self.S[n:, 0:esize] = -self._signs[:, None] * self.E
+            self.S[n:, esize:n] = -self._signs[:, None] * self.D
+            self.S[n:, n:] = np.diag(self.G)
 
-            self.S[2 * esize + 1, 0:esize] = self.Et
-            self.S[2 * esize + 1, esize:2 * esize] = self.Dt
-            self.S[2 * esize + 1, 2 * esize + 1] = self.Gt
-
-        # Formulation of Tosi (I think some terms are wrong)
+        # Formulation of Tosi (I think some terms are wrong), only two regions
         elif self._control['type'] == "Tosi":
-            self.S[2 * esize, 0:esize] = -(self.Eb + np.dot(self.Bb, np.dot(Mi, self.K)))
-            self.S[2 * esize, esize:2 * esize] = -(self.Db + np.dot(self.Bb, np.dot(Mi, self.C)))
-            self.S[2 * esize, 2 * esize] = -np.dot(self.Bb, np.dot(Mi, self.Tb))
-            self.S[2 * esize, 2 * esize + 1] = self.Gb - np.dot(self.Bb, np.dot(Mi, self.Tt))
-
-            self.S[2 * esize + 1, 0:esize] = self.Et + np.dot(self.Bt, np.dot(Mi, self.K))
-            self.S[2 * esize + 1, esize:2 * esize] = self.Dt + np.dot(self.Bt, np.dot(Mi, self.C))
-            self.S[2 * esize + 1, 2 * esize] = self.Gt + np.dot(self.Bt, np.dot(Mi, self.Tb))
-            self.S[2 * esize + 1, 2 * esize + 1] = np.dot(self.Bt, np.dot(Mi, self.Tt))
+            Bb, Bt = self.B
+            Db, Dt = self.D
+            Eb, Et = self.E
+            Gb, Gt = self.G
+            MiTb, MiTt = MiDotTu.T
+            self.S[2 * esize, 0:esize] = -(Eb + np.dot(Bb, MiDotK))
+            self.S[2 * esize, esize:2 * esize] = -(Db + np.dot(Bb, MiDotC))
+            self.S[2 * esize, 2 * esize] = -np.dot(Bb, MiTb)
+            self.S[2 * esize, 2 * esize + 1] = Gb - np.dot(Bb, MiTt)
+
+            self.S[2 * esize + 1, 0:esize] = Et + np.dot(Bt, MiDotK)
+            self.S[2 * esize + 1, esize:2 * esize] = Dt + np.dot(Bt, MiDotC)
+            self.S[2 * esize + 1, 2 * esize] = Gt + np.dot(Bt, MiTb)
+            self.S[2 * esize + 1, 2 * esize + 1] = np.dot(Bt, MiTt)
 
         else:
             sys.exit("ERROR: No type in fsi formulation found...")
 
     def calcNumbers(self):
         super().calcNumbers()
-        self.dimNumbers['Mr'] = massRatio(self)
-        self.dimNumbers['Kr'] = stiffnessRatio(self)
-        self.dimNumbers['Gr'] = gapRatio(self)
-        self.dimNumbers['Vp'] = viscousParameter(self)
+        self._dimNumbers['Mr'] = massRatio(self)
+        self._dimNumbers['Kr'] = stiffnessRatio(self)
+        self._dimNumbers['Gr'] = gapRatio(self)
+        self._dimNumbers['Vp'] = viscousParameter(self)
 
 
 # Dimensional numbers of this model
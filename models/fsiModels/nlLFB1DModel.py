@@ -60,6 +60,7 @@ class nlLFB1D(fsiBase):
     def update(self, who, time, state):
         if who == 'solid':
             self.sState = state
+            self.state[self._i0:self._i2] = state
             # Update the solid (UPDATED FIRST BECAUSE IT IS A FLUID BOUNDARY)
             a = state[self._i0:self._i1]
             da = state[self._i1:self._i2]
@@ -73,6 +74,7 @@ class nlLFB1D(fsiBase):
             # Update the rhs (this is, dQ) with the new Q and get the pressure
             # right since it is a function of dQ
             self.fState = state
+            self.state[self._i2:self._i3] = state
             # self._flow.rhs(time, state)
             self._flow.update(time, state)  # Update the flow variables
 
@@ -83,21 +85,142 @@ class nlLFB1D(fsiBase):
             for i, region in enumerate(self._flow.regions):
                 region.update()
 
-    def rhsSolid(self, time, solidState):
+        elif who == 'state':
+            # Update every field from the monolithic state
+            self.state = state
+            self.sState = state[self._i0:self._i2]
+            self.fState = state[self._i2:self._i3]
+            dda = self.rhsMonolithic(time, state)[self._i1:self._i2]
+            self._solid.update(state[self._i0:self._i1], state[self._i1:self._i2], dda)
+            for region in self._flow.regions:
+                region.update()
+            self._flow.rhs(time, self.fState)  # Pressures with the boundary acceleration
+            self._flow.updateForces(time)
+
+    # Copy of the state variables, used to repeat a time step
+    def checkpoint(self):
+        return {'sState': self.sState.copy(),
+                'fState': self.fState.copy(),
+                'rhs': self.rhs.copy()}
+
+    # Go back to a checkpoint (solid, regions and flow are updated)
+    def restore(self, time, checkpoint):
+        self.rhs[:] = checkpoint['rhs']
+        self.update('solid', time, checkpoint['sState'].copy())
+        self.update('regions', None, None)
+        self.update('flow', time, checkpoint['fState'].copy())
+
+    # Rhs of the monolithic scheme, the modal accelerations are solved together
+    # with the flow added mass so no field is lagged
+    def rhsMonolithic(self, time, state):
         solid = self._solid
         flow = self._flow
+        a = state[self._i0:self._i1]
+        da = state[self._i1:self._i2]
+
+        # Update the geometry, the boundary acceleration is added below
+        solid.update(a, da, np.zeros(solid.dof))
+        for region in flow.regions:
+            region.update()
+
+        # Flow rate accelerations and pressures without boundary acceleration
+        dQ0 = flow.rhs(time, state[self._i2:self._i3])
+
+        # Solve the modal accelerations including the added mass
+        dQa, A = self.addedMass()
+        b = (np.dot(solid.S, state[self._i0:self._i2]) +
+             solid.F +
+             solid.addedStateModalForce(flow.deltaPx[0]))[solid.dof:solid.sof]
+        dda = np.linalg.solve(np.identity(solid.dof) - A, b)
+
+        rhs = np.zeros(self.dof)
+        rhs[self._i0:self._i1] = da
+        rhs[self._i1:self._i2] = dda
+        rhs[self._i2:self._i3] = dQ0 + np.dot(dQa, dda)
+        self.rhs[:] = rhs
+        return rhs
+
+    # Flow rate accelerations per unit modal acceleration (dQa) and modal
+    # forces per unit modal acceleration (A) of the current geometry
+    def addedMass(self):
+        solid = self._solid
+        dQa, dPa = self._flow.addedMass()
+        A = np.zeros((solid.dof, solid.dof))
+        for k in range(solid.dof):
+            A[:, k] = solid.addedStateModalForce(dPa[k])[solid.dof:solid.sof]
+        return dQa, A
+
+    # Approximate Jacobian of rhsMonolithic. The solid block includes the added
+    # mass, the flow block is the analytic flow Jacobian and the modal forces
+    # depend on the flow rates through the pressure difference (see
+    # pressureJac). The dependence of the pressures on the geometry is
+    # neglected (it only affects the convergence rate of the Newton iterations
+    # of the implicit integrators)
+    def jacMonolithic(self, time, state):
+        solid = self._solid
+        flow = self._flow
+        solid.update(state[self._i0:self._i1], state[self._i1:self._i2], np.zeros(solid.dof))
+        for region in flow.regions:
+            region.update()
+        J = np.zeros((self.dof, self.dof))
+        Jf = flow.jac(time, state[self._i2:self._i3])
+        dPx = flow.pressureJac(time, state[self._i2:self._i3])
+        dQa, A = self.addedMass()
+        IA = np.identity(solid.dof) - A
+        Js = solid.jac(time, state[self._i0:self._i2])
+        Fq = np.zeros((solid.dof, flow.dof))
+        for j in range(flow.dof):
+            Fq[:, j] = solid.addedStateModalForce(dPx[j])[solid.dof:solid.sof]
+        J[self._i0:self._i1, self._i0:self._i2] = Js[0:solid.dof]
+        J[self._i1:self._i2, self._i0:self._i2] = np.linalg.solve(IA, Js[solid.dof:solid.sof])
+        J[self._i1:self._i2, self._i2:self._i3] = np.linalg.solve(IA, Fq)
+        J[self._i2:self._i3, self._i0:self._i3] = np.dot(dQa, J[self._i1:self._i2, self._i0:self._i3])
+        J[self._i2:self._i3, self._i2:self._i3] += Jf
+        return J
+
+    # Rhs of the solid, the fluid load is the current pressure difference
+    # unless another one is given
+    def rhsSolid(self, time, solidState, deltaPx=None):
+        solid = self._solid
         self.rhs[self._i0:self._i2] = (np.dot(solid.S, solidState) +
                                        solid.F +
-                                       solid.addedStateModalForce(flow.deltaPx[0]))
+                                       self.fluidForce(deltaPx))
         return self.rhs[self._i0:self._i2]
 
+    # State force of the pressure difference deltaPx. The current one is
+    # projected by the reduced flow operators when they are in use
+    def fluidForce(self, deltaPx=None):
+        solid = self._solid
+        if deltaPx is None:
+            load = self._flow.modalLoad()
+            if load is not None:
+                return solid.stateModalForce(load)
+            deltaPx = self._flow.deltaPx[0]
+        return solid.addedStateModalForce(deltaPx)
+
+    # Advance the solid from state0 with the exact propagator, the fluid load is
+    # frozen in tspan
+    def propagateSolid(self, tspan, state0, deltaPx=None):
+        solid = self._solid
+        load = solid.F + self.fluidForce(deltaPx)
+        state = solid.propagate(state0, load, tspan[1] - tspan[0])
+        self.rhsSolid(tspan[1], state, deltaPx)  # Keep the rhs (accelerations) of the final state
+        return state
+
+    # Jacobian of rhsSolid (the fluid load is frozen during the solid solution)
+    def jacSolid(self, time, solidState, deltaPx=None):
+        return self._solid.jac(time, solidState)
+
+    def jacSolidSparse(self, time, solidState, deltaPx=None):
+        return self._solid.jacSparse(time, solidState)
+
 
     def calcNumbers(self):
         super().calcNumbers()
-        self.dimNumbers['Mr'] = massRatio(self)
-        self.dimNumbers['Kr'] = stiffnessRatio(self)
-        self.dimNumbers['Gr'] = gapRatio(self)
-        self.dimNumbers['Vp'] = viscousParameter(self)
+        self._dimNumbers['Mr'] = massRatio(self)
+        self._dimNumbers['Kr'] = stiffnessRatio(self)
+        self._dimNumbers['Gr'] = gapRatio(self)
+        self._dimNumbers['Vp'] = viscousParameter(self)
 
 
 # Dimensional numbers of this model
@@ -21,6 +21,8 @@ import numpy as np
 import scipy.optimize as opt
 from scipy import interpolate
 import scipy.integrate as si
+import scipy.linalg as sl
+import scipy.sparse as sp
 import matplotlib.pyplot as plt
 
 from pyFSI.vectors.eigen import eigenValue as eval, eigenVector as evec, eigenSystemVector as esys
@@ -45,8 +47,11 @@ class bernoulliEulerBeam(solidModel):
         self.Minv = np.zeros((self.dof, self.dof))
         self.sof = 2 * self.dof
         self.S = np.zeros((self.sof, self.sof)) # State Matrix
+        self.Ssparse = None  # Sparse (csc) copy of the state matrix
         self.F = np.zeros(self.sof)  # Modal load
         self.state = np.zeros(self.sof)
+        self.expS = None  # Matrix exponential of S*dt
+        self.phiS = None  # Integral of the exponential of S in dt
         self.a = None  # Generalized displacement
         self.da = None  # Generalized velocity
         self.dda = None  # Generalized acceleration
@@ -55,6 +60,7 @@ class bernoulliEulerBeam(solidModel):
         self.y = {}   # Current position of top, bot and mid surfaces
         self.dy = {}  # Current velocity of top, bot and mid surfaces
         self.ddy = {}  # Current accelerations of top, bot and mid surfaces
+        self.version = 0  # Increased on every update of the position
         self.eigen = None  # Eigensystem
         # Dimensional analysis
         self.lRef = None  # Reference length
@@ -71,6 +77,7 @@ class bernoulliEulerBeam(solidModel):
         # ----- Private attributes ----- #
         # Flags
         self._updated = False
+        self._dtExp = None  # Time step of the current propagator
         # Messages
         if self._debug:
             print("     WARNING: Beam initial conditions set to zero. ")
@@ -105,6 +112,7 @@ class bernoulliEulerBeam(solidModel):
         # Update the accelerations
         self.ddy['mid'] = self.eigen.reconstruct(self.dda)
 
+        self.version += 1
         self._updated = True
 
     # Build the dynamic vectors
@@ -152,14 +160,40 @@ class bernoulliEulerBeam(solidModel):
         self.S[0:dof, dof:sof] = I
         self.S[dof:sof, 0:dof] = -np.dot(self.Minv, self.K)
         self.S[dof:sof, dof:sof] = -np.dot(self.Minv, self.C)
+        self.Ssparse = sp.csc_matrix(self.S)
+
+    # Jacobian of the modal state equations (the state matrix is constant)
+    def jac(self, time, state):
+        return self.S
+
+    def jacSparse(self, time, state):
+        return self.Ssparse
+
+    # Exact solution of the modal equations for a load that is constant in dt.
+    # exp(S*dt) and its integral are taken from the exponential of the augmented
+    # matrix [[S, I], [0, 0]]*dt, and only recomputed when dt changes
+    def propagate(self, state, load, dt):
+        if self._dtExp is None or not np.isclose(dt, self._dtExp, rtol=1E-10, atol=0.0):
+            A = np.zeros((2 * self.sof, 2 * self.sof))
+            A[0:self.sof, 0:self.sof] = self.S * dt
+            A[0:self.sof, self.sof:2 * self.sof] = np.identity(self.sof) * dt
+            E = sl.expm(A)
+            self.expS = E[0:self.sof, 0:self.sof]
+            self.phiS = E[0:self.sof, self.sof:2 * self.sof]
+            self._dtExp = dt
+        return np.dot(self.expS, state) + np.dot(self.phiS, load)
 
     # Add a fluid force
     def addedStateModalForce(self, force):
-        F = np.zeros(self.sof)
         f = np.zeros(self.dof)
         modes = self.eigen.vectors
         for i in range(self.dof):
             f[i] = si.simps(force * modes[i], self._mesh.x)
+        return self.stateModalForce(f)
+
+    # State force of the modal force f (projections of a force on the modes)
+    def stateModalForce(self, f):
+        F = np.zeros(self.sof)
         F[self.dof:self.sof] = np.dot(self.Minv, f)
         return F
 
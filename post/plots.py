@@ -232,18 +232,20 @@ class pFlux(fsiPlot):
 
 
 class pBifurcation(fsiPlot):
-    def __init__(self, solution, mode0, mode1, var='freq'):
+    def __init__(self, solution, mode0, mode1, var='freq', tracked=False):
         super().__init__()
         self.P = self.axe.scatter([], [], edgecolors='k', facecolors='r', s=10)
         self.bif = []  # Bifurcation points list
-        size = len(solution[0][0].ES.evalues())
+        # Use the tracked eigen system (modes keep their index along the parameter)
+        system = 'ET' if tracked else 'ES'
+        size = len(getattr(solution[0][0], system).evalues())
 
         for sol in solution:  # Loop through the parameters
             oldReals = -np.ones(size)  # Assume stability
             searchModes = range(mode0, mode1)
             for fsi in sol:
-                newReals = np.real(fsi.ES.evalues())
-                newImags = np.imag(fsi.ES.evalues())
+                newReals = np.real(getattr(fsi, system).evalues())
+                newImags = np.imag(getattr(fsi, system).evalues())
                 signs = np.sign(newReals) + np.sign(oldReals)
 
                 # Extract all unstable states
@@ -0,0 +1,91 @@
+# --------------------------------------------------------------------------- #
+#    p    #     version: 0.1
+#    y    #     date: 18/10/2026
+#    F    #     author: Martin Saravia
+#    S    #     description: Acceleration of the partitioned coupling iterations
+#    I    #     return: acceleration object
+# --------------------------------------------------------------------------- #
+# Notes:
+#   The methods work on the interface vector x (the solid state) and its value
+#   after one pass of the fields xt = H(x). The residual is r = xt - x.
+#   constant: fixed under-relaxation
+#   aitken: Aitken dynamic relaxation
+#   IQNILS: interface quasi-Newton with inverse Jacobian from least squares
+# --------------------------------------------------------------------------- #
+import numpy as np
+from abc import ABC, abstractmethod
+
+
+class accelerationBase(ABC):
+    def __init__(self, omega):
+        self._omega0 = omega  # Initial relaxation factor
+        self._rOld = None  # Residual of the previous iteration
+        self._xtOld = None  # Field value of the previous iteration
+
+    # Forget the iterations of the previous time step
+    def reset(self):
+        self._rOld = None
+        self._xtOld = None
+
+    # Return the next interface iterate
+    @abstractmethod
+    def update(self, x, xt):
+        pass
+
+
+# Constant under-relaxation
+class constant(accelerationBase):
+    def __init__(self, omega):
+        super().__init__(omega)
+
+    def update(self, x, xt):
+        return x + self._omega0 * (xt - x)
+
+
+# Aitken dynamic relaxation
+class aitken(accelerationBase):
+    def __init__(self, omega):
+        super().__init__(omega)
+        self._omega = omega
+
+    def update(self, x, xt):
+        r = xt - x
+        if self._rOld is None:
+            self._omega = self._omega0
+        else:
+            dr = r - self._rOld
+            if np.dot(dr, dr) > 0.0:
+                self._omega = -self._omega * np.dot(self._rOld, dr) / np.dot(dr, dr)
+        self._rOld = r
+        return x + self._omega * r
+
+
+# Interface quasi-Newton inverse least squares (IQN-ILS)
+class IQNILS(accelerationBase):
+    def __init__(self, omega):
+        super().__init__(omega)
+        self._V = []  # Residual differences
+        self._W = []  # Field value differences
+
+    def reset(self):
+        super().reset()
+        self._V = []
+        self._W = []
+
+    def update(self, x, xt):
+        r = xt - x
+        if self._rOld is None:  # First iteration is relaxed
+            xNew = x + self._omega0 * r
+        else:
+            # Newest differences first, keep at most as many columns as unknowns
+            self._V.insert(0, r - self._rOld)
+            self._W.insert(0, xt - self._xtOld)
+            del self._V[x.size:]
+            del self._W[x.size:]
+            V = np.array(self._V).T
+            W = np.array(self._W).T
+            c = np.linalg.lstsq(V, -r, rcond=None)[0]
+            xNew = xt + np.dot(W, c)
+        self._rOld = r
+        self._xtOld = xt
+        return xNew
@@ -1,20 +1,80 @@
+# --------------------------------------------------------------------------- #
+#    p    #     version: 0.1
+#    y    #     date: 18/10/2026
+#    F    #     author: Martin Saravia
+#    S    #     description: Eigen solver of the parametric state matrices
+#    I    #     return: solver object
+# --------------------------------------------------------------------------- #
+# Notes:
+#   The state matrices of a block of "batch" parameter steps (default 1) are
+#   stacked and solved in one vectorized call. The outputs of the other
+#   objects are written while the block is assembled and the eigen outputs
+#   after the solution, so every file keeps one line per step. Only the
+#   eigenvalues are calculated when the eigenVectors are not in the output
+#   and the modes are not tracked. The tracked modes (see modeTracking) are
+#   written to trackedEigenValues, trackedEigenVectors and trackingMAC.
+#   Set in execution.solver:
+#   "batch": 100,
+#   "tracking": {}
+# --------------------------------------------------------------------------- #
 import numpy as np
 
 from pyFSI.vectors.eigen import eigenSystem as es
 from pyFSI.solvers.solverBase import solverBase
+from pyFSI.solvers.modeTracking import modeTracker
 
 class eigen(solverBase):
     def __init__(self, fsi, odb):
         super().__init__(fsi, odb)
+        if 'batch' in self.control:
+            self._batch = self.control['batch']
+        else:
+            self._batch = 1
+        if 'tracking' in self.control:
+            self.tracker = modeTracker(self.control['tracking'])
+        else:
+            self.tracker = None
+        output = self._execution['output']
+        self._vectors = (fsi.name in output and 'eigenVectors' in output[fsi.name]) or self.tracker is not None
+        # Outputs written after the eigen solution
+        self._eigenFiles = [(fsi.name, var) for var in
+                            ['eigenValues', 'eigenVectors', 'trackedEigenValues', 'trackedEigenVectors', 'trackingMAC']]
 
     def solve(self):
         time = self._time
+        stack = None
+        times = np.empty(self._batch)
         while time.value <= time.end:
-            time.advance()
-            print("  Solving the MFSI case:", self._fsi.name, "for time ", time.value)
-            self._fsi.update()
-            evalues, evectors = np.linalg.eig(self._fsi.S)
-            self._fsi.ES = es.eigenSystem(evalues, evectors, sort=True)
-            self._odb.write()
+            # Assemble the state matrices of the block
+            n = 0
+            while time.value <= time.end and n < self._batch:
+                time.advance()
+                print("  Solving the MFSI case:", self._fsi.name, "for time ", time.value)
+                self._fsi.update()
+                if stack is None:
+                    stack = np.empty((self._batch,) + self._fsi.S.shape)
+                stack[n] = self._fsi.S
+                times[n] = time.value
+                self._odb.write(skip=self._eigenFiles)
+                n += 1
+
+            # Solve the block
+            if self._vectors:
+                evalues, evectors = np.linalg.eig(stack[:n])
+            else:
+                evalues = np.linalg.eigvals(stack[:n])
+                evectors = np.full(evalues.shape, None)
+            for k in range(n):
+                self._fsi.ES = es.eigenSystem(evalues[k], evectors[k], sort=True)
+                if self.tracker is not None:
+                    values, vectors = self.tracker.track(times[k], evalues[k], evectors[k])
+                    self._fsi.ET = es.eigenSystem(values, vectors.T)
+                    self._fsi.trackingMAC = self.tracker.mac
+                    self.tracked(times[k], values, vectors)
+                self._odb.write(only=self._eigenFiles)
 
         self._odb.close()
+
+    # Tracked modes of the parameter t (for derived solvers)
+    def tracked(self, t, values, vectors):
+        pass
@@ -0,0 +1,232 @@
+# --------------------------------------------------------------------------- #
+#    p    #     version: 0.1
+#    y    #     date: 18/10/2026
+#    F    #     author: Martin Saravia
+#    S    #     description: Fixed step implicit integrators
+#    I    #     return: integrator object
+# --------------------------------------------------------------------------- #
+# Notes:
+#   Lightweight replacement of solve_ivp for small stiff systems. The object
+#   lives for the whole run and keeps the Newton iteration matrix I - h*g*J and
+#   its LU factors between calls. They are rebuilt only when the step changes
+#   or the Newton iterations stop converging. The work arrays are allocated
+#   once, so each step only evaluates the rhs and solves with the old factors.
+#   If the Newton iterations do not converge with a fresh Jacobian the step
+#   is rejected and taken as two halves (up to maxHalvings times), and a
+#   convergenceError is raised when the halvings are exhausted.
+#   SDIRK2: two stage, L-stable, singly diagonally implicit Runge-Kutta
+#   BDF2: two step backward differentiation (SDIRK2 is the starting step)
+# --------------------------------------------------------------------------- #
+import numpy as np
+import scipy.linalg as sl
+from abc import ABC, abstractmethod
+
+# Names accepted in the integrator list
+methods = ['SDIRK2', 'BDF2']
+
+
+# Newton iterations that did not converge
+class convergenceError(Exception):
+    pass
+
+
+class fixedStepBase(ABC):
+    def __init__(self, fun, jac, size, atol, rtol, steps=1):
+        self.fun = fun  # Rhs f(t, y, *args)
+        self.jac = jac  # Jacobian J(t, y), finite differences if None
+        self.atol = atol
+        self.rtol = rtol
+        self.steps = steps  # Steps in each call to integrate
+        self.maxIter = 4  # Newton iterations before refreshing the Jacobian
+        self.maxHalvings = 5  # Halvings of a rejected step
+        self.nfev = 0  # Statistics
+        self.njev = 0
+        self.nlu = 0
+        self.rejected = 0
+
+        # Newton iteration matrix
+        self._gamma = 1.0  # Implicit coefficient of the method
+        self._h = None  # Step of the current call
+        self._hg = None  # h*g of the current factorization
+        self._J = None
+        self._lu = None
+
+        # Work arrays
+        self._y = np.zeros(size)
+        self._z = np.zeros(size)
+        self._dz = np.zeros(size)
+        self._c = np.zeros(size)
+        self._w = np.zeros(size)
+        self._eye = np.eye(size)
+
+    # Integrate from y0 over tspan, returns the final state
+    def integrate(self, tspan, y0, args=()):
+        h = (tspan[1] - tspan[0]) / self.steps
+        if self._h is None or not np.isclose(h, self._h, rtol=1E-10, atol=0.0):
+            self._h = h
+            self._lu = None  # The iteration matrix changed
+        self._y[:] = y0
+        t = tspan[0]
+        for n in range(self.steps):
+            self.advance(t, h, args)
+            t = tspan[0] + (n + 1) * h
+        return self._y.copy()
+
+    # Advance self._y from t to t + h, a rejected step is taken as two halves
+    def advance(self, t, h, args, depth=0):
+        y0 = self._y.copy()
+        try:
+            self.step(t, h, args)
+        except convergenceError:
+            if depth == self.maxHalvings:
+                raise
+            self.rejected += 1
+            self._y[:] = y0
+            self.restart()
+            self.advance(t, 0.5 * h, args, depth + 1)
+            self.advance(t + 0.5 * h, 0.5 * h, args, depth + 1)
+            self.resume(y0)
+
+    # Advance self._y from t to t + h, raises convergenceError if the Newton
+    # iterations do not converge
+    @abstractmethod
+    def step(self, t, h, args):
+        pass
+
+    # Called before the halves of a rejected step
+    def restart(self):
+        pass
+
+    # Called after the halves of a rejected step that started at y0
+    def resume(self, y0):
+        pass
+
+    # Solve z = c + h*g*f(t, z) by Newton iterations starting from self._z
+    def newton(self, t, h, args):
+        hg = h * self._gamma
+        for refresh in range(2):
+            if self._lu is None or not np.isclose(hg, self._hg, rtol=1E-10, atol=0.0):
+                self.factorize(t, hg, args)
+            for k in range(self.maxIter):
+                # Residual of the stage equation, dz = c + hg*f(z) - z. The
+                # models keep the state they are given, so they get a copy of z
+                np.multiply(self.fun(t, self._z.copy(), *args), hg, out=self._dz)
+                self.nfev += 1
+                self._dz += self._c
+                self._dz -= self._z
+                self._dz[:] = sl.lu_solve(self._lu, self._dz, check_finite=False)
+                self._z += self._dz
+                np.abs(self._z, out=self._w)
+                self._w *= self.rtol
+                self._w += self.atol
+                np.divide(self._dz, self._w, out=self._w)
+                if np.sqrt(np.mean(self._w ** 2)) < 1E-2:
+                    return
+            self._lu = None  # Rebuild the Jacobian and try again
+        raise convergenceError("The Newton iterations of the fixed step integrator did not converge at time " +
+                               str(t) + " with step " + str(h))
+
+    # Jacobian and LU factors of I - hg*J at the current iterate
+    def factorize(self, t, hg, args):
+        if self.jac is not None:
+            self._J = np.asarray(self.jac(t, self._z.copy()))
+        else:
+            self._J = self.finiteDifferences(t, args)
+        self.njev += 1
+        self._hg = hg
+        self._lu = sl.lu_factor(self._eye - hg * self._J, check_finite=False)
+        self.nlu += 1
+
+    # Forward difference Jacobian
+    def finiteDifferences(self, t, args):
+        f0 = np.array(self.fun(t, self._z.copy(), *args))
+        J = np.zeros((self._z.size, self._z.size))
+        for j in range(self._z.size):
+            z = self._z.copy()
+            dz = np.sqrt(np.finfo(float).eps) * max(1.0, abs(z[j]))
+            z[j] += dz
+            J[:, j] = (self.fun(t, z, *args) - f0) / dz
+        self.nfev += self._z.size + 1
+        return J
+
+
+# Alexander's two stage SDIRK, second order and L-stable
+class SDIRK2(fixedStepBase):
+    def __init__(self, fun, jac, size, atol, rtol, steps=1):
+        super().__init__(fun, jac, size, atol, rtol, steps)
+        self._gamma = 1.0 - 1.0 / np.sqrt(2.0)
+        self._k1 = np.zeros(size)
+
+    def step(self, t, h, args):
+        g = self._gamma
+        # Stage 1: z1 = y + h*g*f(t + g*h, z1)
+        self._c[:] = self._y
+        self._z[:] = self._y
+        self.newton(t + g * h, h, args)
+        self._k1[:] = self._z
+        self._k1 -= self._y
+        self._k1 *= (1.0 - g) / g  # h*(1-g)*f(z1)
+        # Stage 2: z2 = y + h*(1-g)*f(z1) + h*g*f(t + h, z2)
+        self._c += self._k1
+        self._z += self._k1
+        self.newton(t + h, h, args)
+        self._y[:] = self._z
+
+
+# Two step BDF. The previous state is kept between calls when the new call
+# starts where the last one ended (or repeats the last call, as in the
+# coupling iterations), otherwise the method restarts with an SDIRK2 step
+class BDF2(SDIRK2):
+    def __init__(self, fun, jac, size, atol, rtol, steps=1):
+        super().__init__(fun, jac, size, atol, rtol, steps)
+        self._yOld = np.zeros(size)  # State at t - h
+        self._history = False  # True if self._yOld is valid
+        self._start = None  # (t, y, yOld, history) at the beginning of the last call
+        self._end = None  # (t, y, yOld) at the end of the last call
+
+    def integrate(self, tspan, y0, args=()):
+        h = (tspan[1] - tspan[0]) / self.steps
+        sameStep = self._h is not None and np.isclose(h, self._h, rtol=1E-10, atol=0.0)
+        if self._end is not None and sameStep and self._end[0] == tspan[0] and np.array_equal(self._end[1], y0):
+            self._yOld[:] = self._end[2]
+            self._history = True
+        elif self._start is not None and sameStep and self._start[0] == tspan[0] and np.array_equal(self._start[1], y0):
+            self._yOld[:] = self._start[2]
+            self._history = self._start[3]
+        else:
+            self._history = False
+        self._start = (tspan[0], np.array(y0, dtype=float), self._yOld.copy(), self._history)
+        y = super().integrate(tspan, y0, args)
+        self._end = (tspan[1], y.copy(), self._yOld.copy())
+        return y
+
+    # The halves of a rejected step restart the method, and the state at the
+    # beginning of the step is the previous state of the next full step
+    def restart(self):
+        self._history = False
+
+    def resume(self, y0):
+        self._yOld[:] = y0
+        self._gamma = 2.0 / 3.0
+        self._history = True
+
+    def step(self, t, h, args):
+        if not self._history:
+            # Starting step
+            self._yOld[:] = self._y
+            self._gamma = 1.0 - 1.0 / np.sqrt(2.0)
+            self._lu = None
+            super().step(t, h, args)
+            self._gamma = 2.0 / 3.0
+            self._lu = None
+            self._history = True
+            return
+        # y1 = 4/3*y0 - 1/3*yOld + 2/3*h*f(t + h, y1), predictor 2*y0 - yOld
+        np.multiply(self._y, 4.0 / 3.0, out=self._c)
+        np.multiply(self._yOld, 1.0 / 3.0, out=self._w)
+        self._c -= self._w
+        np.multiply(self._y, 2.0, out=self._z)
+        self._z -= self._yOld
+        self.newton(t + h, h, args)
+        self._yOld[:] = self._y
+        self._y[:] = self._z
@@ -0,0 +1,43 @@
+# --------------------------------------------------------------------------- #
+#    p    #     version: 0.1
+#    y    #     date: 18/10/2026
+#    F    #     author: Martin Saravia
+#    S    #     description: Predictor of interface quantities
+#    I    #     return: predictor object
+# --------------------------------------------------------------------------- #
+# Notes:
+#   Stores the accepted interface states and extrapolates them in time with
+#   a Lagrange polynomial (order 1 is linear, order 2 is quadratic). Real
+#   states are stored as floats and complex states keep their type.
+# --------------------------------------------------------------------------- #
+import numpy as np
+
+
+class interfacePredictor:
+    def __init__(self, order=1):
+        self.order = order
+        self._t = []  # Times of the stored states
+        self._x = []  # Stored states (newest first)
+
+    # Store an accepted state
+    def push(self, t, x):
+        self._t.insert(0, t)
+        self._x.insert(0, np.array(x, dtype=np.result_type(np.asarray(x), float)))
+        del self._t[self.order + 1:]
+        del self._x[self.order + 1:]
+
+    # True if there are enough states for the extrapolation
+    def ready(self):
+        return len(self._t) > self.order
+
+    # Extrapolate the state to time t (uses a lower order until enough states are stored)
+    def predict(self, t):
+        n = len(self._t)
+        x = np.zeros_like(self._x[0])
+        for i in range(n):
+            li = 1.0
+            for j in range(n):
+                if j != i:
+                    li *= (t - self._t[j]) / (self._t[i] - self._t[j])
+            x += li * self._x[i]
+        return x
@@ -0,0 +1,69 @@
+# --------------------------------------------------------------------------- #
+#    p    #     version: 0.1
+#    y    #     date: 18/10/2026
+#    F    #     author: Martin Saravia
+#    S    #     description: Eigenmode tracking across parametric steps
+#    I    #     return: tracker object
+# --------------------------------------------------------------------------- #
+# Notes:
+#   Keeps the identity of the eigenpairs when the parameter changes. The
+#   first step is ordered by the imaginary part of the eigenvalues. In the
+#   next steps each tracked mode i is paired with a new eigenpair j by
+#   minimizing the total cost
+#       C[i, j] = 1 - MAC(vi, vj) + weight * |li - lj| / |li|
+#   where MAC is the modal assurance criterion of the previous and new
+#   eigenvectors, and li is the eigenvalue of mode i predicted by
+#   extrapolating its tracked values in the parameter (Lagrange polynomial of
+#   the given order). The assignment is solved with linear_sum_assignment.
+#   Set in execution.solver:
+#   "tracking": {"weight": 1.0,    weight of the eigenvalue distance
+#                "order": 1}       order of the eigenvalue prediction
+# --------------------------------------------------------------------------- #
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from pyFSI.solvers.interfacePredictor import interfacePredictor
+
+
+class modeTracker:
+    def __init__(self, control):
+        self.weight = 1.0
+        order = 1
+        if 'weight' in control:
+            self.weight = control['weight']
+        if 'order' in control:
+            order = control['order']
+        self.mac = None  # MAC of the tracked pairs in the last step
+        self._predictor = interfacePredictor(order)
+        self._vectors = None  # Tracked eigenvectors of the last step (columns)
+
+    # Order the eigenpairs of the parameter t (eigenvectors as columns) as the
+    # tracked modes. Returns the ordered eigenvalues and eigenvectors
+    def track(self, t, evalues, evectors):
+        if self._vectors is None:
+            idx = np.argsort(np.imag(evalues))
+            self.mac = np.ones(len(evalues))
+        else:
+            cost, mac = self.cost(self._predictor.predict(t), self._vectors, evalues, evectors)
+            rows, idx = linear_sum_assignment(cost)
+            self.mac = mac[rows, idx]
+        values = evalues[idx]
+        self._vectors = evectors[:, idx]
+        self._predictor.push(t, values)
+        return values, self._vectors
+
+    # Cost of pairing the reference modes (predicted eigenvalues and previous
+    # eigenvectors as columns) with the new eigenpairs. Returns the cost and MAC
+    def cost(self, predicted, vectors, evalues, evectors):
+        distance = np.abs(predicted[:, None] - evalues[None, :])
+        scale = np.maximum(np.abs(predicted), np.finfo(float).tiny)[:, None]
+        mac = self.MAC(vectors, evectors)
+        return 1.0 - mac + self.weight * distance / scale, mac
+
+    # Modal assurance criterion of the columns of A and B
+    @staticmethod
+    def MAC(A, B):
+        AB = np.abs(np.dot(A.conj().T, B)) ** 2
+        AA = np.real(np.sum(A.conj() * A, axis=0))
+        BB = np.real(np.sum(B.conj() * B, axis=0))
+        return AB / np.outer(AA, BB)
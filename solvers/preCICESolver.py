@@ -16,6 +16,7 @@ import numpy as np
 import precice as prc
 
 from pyFSI.solvers.solverBase import solverBase
+from pyFSI.solvers import fixedStepIntegrator
 
 
 # Solver for transient FSI simulations
@@ -43,6 +44,10 @@ class preCICE(solverBase):
         totalTime = precice_dt  # Total simluation time
         flow.setInitialConditions()
         state = flow.Q0
+        if 'integrator' in self.control:
+            method = self.control['integrator'][0]
+        else:
+            method = 'Radau'
 
         # Write initial force data data
         if interface.is_action_required(prc.action_write_initial_data()):
@@ -60,13 +65,19 @@ class preCICE(solverBase):
 
             # Solve the flow
             print("--> Solving the flow for time: ", totalTime)
-            solution = si.solve_ivp(flow.rhs,
-                                    [totalTime, totalTime+precice_dt],
-                                    state,
-                                    method='Radau')
+            if method in fixedStepIntegrator.methods:
+                Q = self.stepper('flow', method, flow.rhs, flow.jac,
+                                 len(state)).integrate([totalTime, totalTime+precice_dt], state)
+            else:
+                solution = si.solve_ivp(flow.rhs,
+                                        [totalTime, totalTime+precice_dt],
+                                        state,
+                                        method=method,
+                                        **self.jacobian(method, flow.jac, flow.jacSparse))
+                Q = solution.y[:, -1]
             # Update the flow state
             print("--> Updating the flow object...")
-            flow.update(totalTime, solution.y[:, -1])
+            flow.update(totalTime, Q)
 
             # Update the pressure distribution
             print("--> Updating the flow pressure distribution...")
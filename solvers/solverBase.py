@@ -10,6 +10,7 @@ import importlib
 from abc import ABCMeta, abstractmethod
 
 from pyFSI.mesh.fsiMesh1D import fsiMesh1D
+from pyFSI.solvers import fixedStepIntegrator
 
 
 class solverBase:
@@ -28,11 +29,45 @@ class solverBase:
         self.output = []
         self.output.append(open(self._execution['paths']['fsiPath'] / 'time.out', 'a+', buffering=bufferSize))
 
+        # Fixed step integrators of each field
+        self._steppers = {}
+
     # Abstract methods
     @abstractmethod
     def solve(self):
         pass
 
+    # Jacobian options for the integrator. Set "jacobian" to "analytic" to pass
+    # the model Jacobians to the implicit integrators, or to "sparse" to pass
+    # the sparse Jacobians of the models that provide them (sparseJac) to Radau
+    # and BDF, which then use sparse LU factorizations. The dense Jacobian is
+    # passed when there is no sparse one
+    def jacobian(self, method, jac, sparseJac=None):
+        if 'jacobian' not in self.control or method not in ['Radau', 'BDF', 'LSODA']:
+            return {}
+        if self.control['jacobian'] == 'sparse' and method != 'LSODA' and sparseJac is not None:
+            return {'jac': sparseJac}
+        elif self.control['jacobian'] in ['analytic', 'sparse']:
+            return {'jac': jac}
+        return {}
+
+    # Fixed step integrator (SDIRK2 or BDF2) of a field, created on the first
+    # call and kept for the whole run so its LU factors are reused. The
+    # "integratorSteps" key sets the steps taken in each time step (default 1)
+    def stepper(self, field, method, fun, jac, size):
+        if field not in self._steppers:
+            if 'integratorSteps' in self.control:
+                steps = self.control['integratorSteps']
+            else:
+                steps = 1
+            if 'jacobian' not in self.control:
+                jac = None  # Finite differences
+            self._steppers[field] = getattr(fixedStepIntegrator, method)(fun, jac, size,
+                                                                         self.control['atol'],
+                                                                         self.control['rtol'],
+                                                                         steps)
+        return self._steppers[field]
+
     # Getters
     def execution(self):
         return self._execution
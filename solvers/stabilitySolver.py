@@ -0,0 +1,81 @@
+# --------------------------------------------------------------------------- #
+#    p    #     version: 0.1
+#    y    #     date: 18/10/2026
+#    F    #     author: Martin Saravia
+#    S    #     description: Stability boundary of the parametric eigen problem
+#    I    #     return: solver object
+# --------------------------------------------------------------------------- #
+# Notes:
+#   Finds the parameter values where the real part of a tracked mode crosses
+#   zero. The parametric sweep of the eigen solver (with the modes tracked)
+#   brackets the crossings between consecutive steps, so deltaT can be
+#   coarse. Each bracket is refined with Brent's method, every evaluation is
+#   one assembly and eigen solution of the state matrix, and the eigenpair of
+#   the mode is identified with the tracking cost against the bracket (only
+#   the mode with non negative imaginary part of each conjugate pair is
+#   reported). The critical parameter, the eigenvalue imaginary part
+#   (frequency) and the tracked mode are written to fsi/stability.out.
+#   Set in execution.solver:
+#   "type": "stability",
+#   "tolerance": 1E-8       absolute tolerance of the critical parameter
+# --------------------------------------------------------------------------- #
+import numpy as np
+import scipy.optimize as so
+
+from pyFSI.solvers.eigenSolver import eigen
+from pyFSI.solvers.modeTracking import modeTracker
+
+
+class stability(eigen):
+    def __init__(self, fsi, odb):
+        super().__init__(fsi, odb)
+        if self.tracker is None:
+            self.tracker = modeTracker({})
+            self._vectors = True
+        self._tolerance = 1E-8
+        if 'tolerance' in self.control:
+            self._tolerance = self.control['tolerance']
+        self.critical = []  # (parameter, frequency, mode) of each crossing
+        self.assemblies = 0  # Assemblies of the refinement
+        self._brackets = []
+        self._last = None  # (t, values, vectors) of the last tracked step
+        self._eigenvalue = None  # Eigenvalue of the last refinement evaluation
+
+    def solve(self):
+        super().solve()
+        print("---> Refining", len(self._brackets), "stability crossings...")
+        output = open(self._execution['paths']['fsiPath'] / 'stability.out', 'a+', buffering=1)
+        output.write('# parameter frequency mode\n')
+        for bracket in self._brackets:
+            parameter = self.refine(*bracket)
+            frequency = np.imag(self._eigenvalue)
+            self.critical.append((parameter, frequency, bracket[2]))
+            print("---> Critical parameter", parameter, "frequency", frequency, "mode", bracket[2])
+            output.write(str(parameter) + " " + str(frequency) + " " + str(bracket[2]) + "\n")
+        output.close()
+        print("---> Stability boundary found with", self.assemblies, "assemblies")
+
+    # Bracket the sign changes of the real part of the tracked modes
+    def tracked(self, t, values, vectors):
+        if self._last is not None:
+            t0, values0, vectors0 = self._last
+            crossing = np.sign(np.real(values0)) != np.sign(np.real(values))
+            for mode in np.flatnonzero(crossing & (np.imag(values) >= 0)):
+                self._brackets.append((t0, t, mode, values0[mode], values[mode], vectors0[:, mode]))
+        self._last = (t, values, vectors)
+
+    # Critical parameter of a mode in [t0, t1]
+    def refine(self, t0, t1, mode, value0, value1, vector0):
+        def realPart(t):
+            self._time.value = t
+            self._fsi.update()
+            self.assemblies += 1
+            evalues, evectors = np.linalg.eig(self._fsi.S)
+            predicted = value0 + (value1 - value0) * (t - t0) / (t1 - t0)
+            cost, mac = self.tracker.cost(np.array([predicted]), vector0[:, None], evalues, evectors)
+            self._eigenvalue = evalues[np.argmin(cost[0])]
+            return np.real(self._eigenvalue)
+
+        parameter = so.brentq(realPart, t0, t1, xtol=self._tolerance)
+        realPart(parameter)  # Eigenvalue at the critical parameter
+        return parameter
@@ -0,0 +1,97 @@
+# --------------------------------------------------------------------------- #
+#    p    #     version: 0.1
+#    y    #     date: 18/10/2026
+#    F    #     author: Martin Saravia
+#    S    #     description: Termination events of transient solutions
+#    I    #     return: events object
+# --------------------------------------------------------------------------- #
+# Notes:
+#   Stops a transient run when its outcome is known. Set in execution.solver:
+#   "events": {"contact": 0.9,          fraction of the initial gap closed at the tip
+#              "nonFinite": "yes",      stop when the state is not finite
+#              "steady": {"window": 0.05, "tolerance": 1E-3}}
+#   The steady state is checked over consecutive time windows of the modal
+#   coordinates. The solution is steady when the amplitude of the last window
+#   decayed below tolerance times the largest amplitude, and periodic when the
+#   amplitude and the mean of the last two windows differ less than tolerance
+#   times the amplitude. The stop time and reason are written to fsi/events.out
+# --------------------------------------------------------------------------- #
+import numpy as np
+
+
+class terminationEvents:
+    def __init__(self, control, fsi, path):
+        self._fsi = fsi
+        self._control = control
+        self._gap0 = self.tipGap()  # Region sizes at the tip at the beginning of the run
+
+        # Steady state windows
+        if 'steady' in control:
+            self._window = control['steady']['window']
+            self._tolerance = control['steady']['tolerance']
+        self._samples = []  # Modal coordinates of the current window
+        self._tWindow = None  # Start time of the current window
+        self._amplitudes = []  # Amplitude of the complete windows
+        self._means = []  # Mean of the complete windows
+
+        self.reason = None
+        self.output = open(path / 'events.out', 'a+', buffering=1)
+        self.output.write('# time event\n')
+
+    # Check the events at time t, returns the stop reason or None
+    def check(self, t):
+        if 'nonFinite' in self._control and self._control['nonFinite'] == 'yes':
+            if not np.all(np.isfinite(self._fsi.state)):
+                return self.stop(t, 'nonFinite')
+        if 'contact' in self._control and self.contact():
+            return self.stop(t, 'contact')
+        if 'steady' in self._control:
+            reason = self.steady(t)
+            if reason is not None:
+                return self.stop(t, reason)
+        return None
+
+    # True if any region closed the given fraction of its initial gap at the tip
+    def contact(self):
+        gap = self.tipGap()
+        return np.any(self._gap0 - gap >= self._control['contact'] * self._gap0)
+
+    # Region sizes at the tip
+    def tipGap(self):
+        return np.array([region.data['s'][-1] for region in self._fsi.flow().regions])
+
+    # Steady or periodic state from the windowed amplitude of the modal coordinates
+    def steady(self, t):
+        if self._tWindow is None:
+            self._tWindow = t
+        self._samples.append(np.array(self._fsi.solid().a, dtype=float))
+        if t - self._tWindow < self._window:
+            return None
+
+        # Close the window
+        samples = np.array(self._samples)
+        self._amplitudes.append(np.max(np.max(samples, axis=0) - np.min(samples, axis=0)))
+        self._means.append(np.mean(samples, axis=0))
+        self._samples = [self._samples[-1]]
+        self._tWindow = t
+        if len(self._amplitudes) < 2:
+            return None
+
+        amplitude = self._amplitudes[-1]
+        if amplitude <= self._tolerance * max(self._amplitudes):
+            return 'steady'
+        drift = np.max(np.abs(self._means[-1] - self._means[-2]))
+        if (abs(amplitude - self._amplitudes[-2]) <= self._tolerance * amplitude and
+                drift <= self._tolerance * amplitude):
+            return 'periodic'
+        return None
+
+    # Record the stop
+    def stop(self, t, reason):
+        self.reason = reason
+        print("---> Stopping the solution at time", t, "due to event:", reason)
+        self.output.write(str(t) + " " + reason + "\n")
+        return reason
+
+    def close(self):
+        self.output.close()
@@ -1,7 +1,45 @@
+import sys
 import scipy.integrate as si
 import numpy as np
 
+from pyFSI.execution.errors import error
 from pyFSI.solvers.solverBase import solverBase
+from pyFSI.solvers import couplingAcceleration
+from pyFSI.solvers import fixedStepIntegrator
+from pyFSI.solvers.interfacePredictor import interfacePredictor
+from pyFSI.solvers.terminationEvents import terminationEvents
+
+# Integrators of scipy.integrate accepted in the integrator list
+odeSolvers = ['RK23', 'RK45', 'DOP853', 'Radau', 'BDF', 'LSODA']
+
+
+# Integrator classes of scipy.integrate that count their rejected steps in the
+# statistics dictionary given as the stats option. The integrators propose the
+# step h_abs and cut it when the step is rejected, so a step shorter than the
+# proposed one that does not end at the bound was rejected (consecutive cuts
+# of one step count once). LSODA does not expose its step, so its rejections
+# are not counted. The class of each method is created once (see countingSolver)
+countingSolvers = {}
+
+
+def countingSolver(method):
+    if method not in countingSolvers:
+        class solver(getattr(si, method)):
+            def __init__(self, fun, t0, y0, t_bound, stats=None, **options):
+                super().__init__(fun, t0, y0, t_bound, **options)
+                self.stats = stats
+
+            def step(self):
+                h = getattr(self, 'h_abs', None)
+                t = self.t
+                message = super().step()
+                if (self.stats is not None and h is not None and self.status != 'failed'
+                        and self.t != self.t_bound and abs(self.t - t) < (1 - 1E-10) * h):
+                    self.stats['rejected'] += 1
+                return message
+        solver.__name__ = 'counting' + method
+        countingSolvers[method] = solver
+    return countingSolvers[method]
 
 
 # Solver for transient FSI simulations
@@ -9,32 +47,212 @@ class transient(solverBase):
     def __init__(self, fsi, odb):
         super().__init__(fsi, odb)
 
+        # Acceleration of the implicit coupling iterations
+        if self.control['coupling'] == 'implicit':
+            if 'acceleration' in self.control:
+                method = self.control['acceleration']
+            else:
+                method = 'aitken'
+            if 'relaxation' in self.control:
+                omega = self.control['relaxation']
+            else:
+                omega = 0.5
+            self.acceleration = getattr(couplingAcceleration, method)(omega)
+            self.output.append(open(self._execution['paths']['fsiPath'] / 'coupling.out',
+                                    'a+', buffering=1))
+            self.output[-1].write('# time iterations residual\n')
+
+        # Extrapolation of the solid motion fed to the regions before the flow solve
+        if 'predictor' in self.control:
+            orders = {'linear': 1, 'quadratic': 2}
+            if self.control['predictor'] not in orders:
+                sys.exit("ERROR: The predictor must be linear or quadratic...")
+            self.predictor = interfacePredictor(orders[self.control['predictor']])
+            self.predictor.push(self._time.value, self._fsi.sState)
+        else:
+            self.predictor = None
+
+        # Statistics of the scipy integrations of each field
+        self.statistics = {}
+
+        # Early termination of the run
+        if 'events' in self.control:
+            self.events = terminationEvents(self.control['events'], self._fsi,
+                                            self._execution['paths']['fsiPath'])
+        else:
+            self.events = None
+
     def solve(self):
         time = self._time
+        # Keep a single integrator alive for the whole run
+        if 'persistent' in self.control and self.control['persistent'] == 'yes':
+            self.persistent()
+            self.close()
+            return
         # Integrate
-        while time.value <= time.end:
+        adaptive = time.stepping == 'automatic' and self.control['coupling'] != 'monolithic'
+        predictor = interfacePredictor(order=1)
+        predictor.push(time.value, self._fsi.state)
+        while time.running():
+            if adaptive:
+                checkpoint = self._fsi.checkpoint()
             time.advance()
             print("---> Solving for time:", time.value)
             getattr(self, self.control['coupling'])(time.span)  # Choose integration scheme
-            self._odb.write()
+            if adaptive:
+                if not time.adapt(self.staggeringError(predictor, time.value)):
+                    print("     Step rejected, new deltaT:", time.delta)
+                    self._fsi.restore(time.value, checkpoint)
+                    continue
+                predictor.push(time.value, self._fsi.state)
+            if self.predictor is not None:
+                self.predictor.push(time.value, self._fsi.sState)
+            if time.write():
+                self._odb.write()
+            if self.events is not None and self.events.check(time.value):
+                break
+        self.close()
+
+    # Close the database and the output files
+    def close(self):
+        for field, stats in self.statistics.items():
+            print("---> Integrator statistics of the " + field + ": accepted steps", stats['steps'],
+                  "rejected steps", stats['rejected'],
+                  "rhs evaluations", stats['nfev'], "Jacobian evaluations", stats['njev'],
+                  "LU decompositions", stats['nlu'], "regime switches", stats['switches'])
+        for field, stepper in self._steppers.items():
+            print("---> Integrator statistics of the " + field + ": rejected steps", stepper.rejected,
+                  "rhs evaluations", stepper.nfev, "Jacobian evaluations", stepper.njev,
+                  "LU decompositions", stepper.nlu)
+        if getattr(self._fsi.flow(), 'rom', None) is not None:
+            self._fsi.flow().rom.info()
         self._odb.close()
+        for file in self.output:
+            file.close()
+        if self.events is not None:
+            self.events.close()
+
+    # Staggering error of the last step. The coupled state predicted from the
+    # previous steps is compared with the corrected one, weighted as in the
+    # integrators. Returns None until there are enough steps
+    def staggeringError(self, predictor, t):
+        if not predictor.ready():
+            return None
+        x = self._fsi.state
+        e = (x - predictor.predict(t)) / (self.control['atol'] + self.control['rtol'] * np.abs(x))
+        return np.sqrt(np.mean(e ** 2))
+
+    # Monolithic solution with one integrator object for the whole run. The
+    # output is interpolated from the dense output of the integrator, so its
+    # step size, Jacobian and LU factorization survive the output times. The
+    # fixed step integrators keep their factors by themselves (see stepper),
+    # so they take the usual monolithic steps between the output times.
+    def persistent(self):
+        fsi = self._fsi
+        time = self._time
+        if self.control['coupling'] != 'monolithic':
+            sys.exit("ERROR: Persistent integration requires the monolithic coupling...")
+
+        method = self.control['integrator'][0]
+        if method in fixedStepIntegrator.methods:
+            integrator = None
+        elif method in odeSolvers:
+            # The bound covers the last output time of the loop (beyond endTime)
+            stats = self.fieldStatistics('fsi')
+            integrator = countingSolver(method)(fsi.rhsMonolithic,
+                                                time.value,
+                                                fsi.state.copy(),
+                                                time.end + 2 * time.delta,
+                                                stats=stats,
+                                                atol=self.control['atol'],
+                                                rtol=self.control['rtol'],
+                                                **self.jacobian(method, fsi.jacMonolithic))
+        else:
+            sys.exit("ERROR: Unknown integrator " + method + " for the persistent integration. Valid integrators are: " +
+                     str(odeSolvers + fixedStepIntegrator.methods))
+
+        while time.running():
+            time.advance()
+            print("---> Solving for time:", time.value)
+            if integrator is None:
+                self.monolithic(time.span)
+            else:
+                while integrator.t < time.value:
+                    integrator.step()
+                    stats['steps'] += 1
+                    if integrator.status == 'failed':
+                        error("ERROR: The integrator failed at time " + str(integrator.t))
+                        return
+                fsi.update('state', time.value, integrator.dense_output()(time.value))
+            if time.write():
+                self._odb.write()
+            if self.events is not None and self.events.check(time.value):
+                break
+
+        if integrator is not None:
+            stats['nfev'] = integrator.nfev
+            stats['njev'] = integrator.njev
+            stats['nlu'] = integrator.nlu
+
+    def monolithic(self, tspan):
+        fsi = self._fsi
+        method = self.control['integrator'][0]
+        if method in fixedStepIntegrator.methods:
+            stepper = self.stepper('fsi', method, fsi.rhsMonolithic, fsi.jacMonolithic, fsi.state.size)
+            fsi.update('state', tspan[1], stepper.integrate(tspan, fsi.state))
+            return
+
+        # Solve the coupled system, the step is controlled by the integrator
+        offset = fsi.state.size - fsi.flow().dof  # The flow rates are the last variables
+        fsi.update('state', tspan[1], self.integrate('fsi', fsi.rhsMonolithic, tspan, fsi.state,
+                                                     method, self.jacobian(method, fsi.jacMonolithic), offset))
 
+    # Strong coupling, the flow and the solid are iterated inside the step until
+    # the solid state at the end of the step (the interface position) converges.
+    # The residual uses the integrator weights, rms(r / (atol + rtol*|x|)) <= 1
     def implicit(self, tspan):
-        for n in range(1, self.control['subcycles'] + 1):
-            pass
+        fsi = self._fsi
+        fState0 = fsi.fState.copy()  # States at the beginning of the step
+        sState0 = fsi.sState.copy()
+        x = sState0.copy()  # Interface iterate
+        self.acceleration.reset()
+        for k in range(1, self.control['maxIter'] + 1):
+            # Interface position from the current iterate
+            fsi.update('solid', tspan[1], x)
+            fsi.update('regions', None, None)
+
+            # Solve the fields from the beginning of the step
+            fsi.update('flow', tspan[1], self.solveFlow(tspan, fState0))
+            xt = self.solveSolid(tspan, sState0)
+
+            # Check the convergence and accelerate
+            r = xt - x
+            residual = np.sqrt(np.mean((r / (self.control['atol'] +
+                                             self.control['rtol'] * np.abs(xt))) ** 2))
+            if residual <= 1.0:
+                break
+            x = self.acceleration.update(x, xt)
+        else:
+            print("     WARNING: The coupling did not converge in", k, "iterations")
+
+        print("---> Coupling iterations:", k, "residual:", residual)
+        self.output[-1].write(str(tspan[1]) + " " + str(k) + " " + str(residual) + "\n")
+
+        fsi.update('solid', tspan[1], xt)
+        fsi.update('regions', None, None)
 
     def explicit(self, tspan):
         fsi = self._fsi
+        sState0 = fsi.sState.copy()
+
+        # 0) Move the regions to the predicted position at the middle of the step
+        if self.predictor is not None:
+            tMid = 0.5 * (tspan[0] + tspan[1])
+            self.moveRegions(tMid, self.predictor.predict(tMid))
 
         # 1) Solve the flow
         # print("---> Solving the flow")
-        fSol = si.solve_ivp(fsi.flow().rhs,
-                            tspan,
-                            fsi.fState,
-                            method=self.control['integrator'][0],
-                            atol=self.control['atol'],
-                            rtol=self.control['rtol'])
-        fsi.update('flow', tspan[1], fSol.y[:, -1])
+        fsi.update('flow', tspan[1], self.solveFlow(tspan))
 
         # 2) Update the boundary condition
         # print("---> Updating the flow force over the solid")
@@ -42,14 +260,166 @@ class transient(solverBase):
 
         # 3) Solve the solid
         # print("---> Solving the solid")
-        sSol = si.solve_ivp(fsi.rhsSolid,
-                            tspan,
-                            fsi.sState,
-                            method=self.control['integrator'][1],
-                            atol=self.control['atol'],
-                            rtol=self.control['rtol'])
-        fsi.update('solid', tspan[1], sSol.y[:, -1])
+        fsi.update('solid', tspan[1], self.solveSolid(tspan, sState0))
 
         # 4) Update the region geometry
         # print("---> Updating the region position, velocities and accelerations")
         fsi.update('regions', None, None)
+
+    # Second order staggered scheme (Strang splitting): half a solid step, a
+    # flow step with the regions at the middle of the step and half a solid
+    # step. Each solid half step takes the load at its own end of the step and
+    # the flow forces at the end of the step are evaluated with the
+    # extrapolated solid position. With a predictor, the regions follow the
+    # extrapolation of the previous steps instead of the first half step
+    def strang(self, tspan):
+        fsi = self._fsi
+        tMid = 0.5 * (tspan[0] + tspan[1])
+        sState0 = fsi.sState.copy()
+        self.updateFlow(tspan[0], fsi.fState)  # Load at the beginning of the step
+
+        # 1) First half of the solid step
+        xMid = self.solveSolid([tspan[0], tMid])
+
+        # 2) Flow step with the regions at the middle of the step
+        if self.predictor is not None:
+            self.moveRegions(tMid, self.predictor.predict(tMid))
+        else:
+            self.moveRegions(tMid, xMid)
+        fState = self.solveFlow(tspan)
+
+        # 3) Flow forces at the end of the step with the extrapolated position
+        if self.predictor is not None:
+            self.moveRegions(tspan[1], self.predictor.predict(tspan[1]))
+        else:
+            self.moveRegions(tspan[1], 2.0 * xMid - sState0)
+        self.updateFlow(tspan[1], fState)
+
+        # 4) Second half of the solid step and forces at the final position
+        self.moveRegions(tspan[1], self.solveSolid([tMid, tspan[1]], xMid))
+        self.updateFlow(tspan[1], fState)
+
+    # Update the solid and the regions with the solid state x
+    def moveRegions(self, t, x):
+        self._fsi.rhsSolid(t, x)  # Accelerations of the state
+        self._fsi.update('solid', t, x)
+        self._fsi.update('regions', None, None)
+
+    # Update the flow with the state Q and evaluate its pressures at the
+    # current region position (the load seen by the solid)
+    def updateFlow(self, t, Q):
+        self._fsi.flow().rhs(t, Q)
+        self._fsi.update('flow', t, Q)
+
+    # Multirate staggered scheme, the field given by "subcycled" takes
+    # "subcycles" substeps per step.
+    #   flow: the solid is solved first and the flow substeps see the boundary
+    #         motion interpolated between the initial and final modal states
+    #   solid: the flow is solved first and the solid substeps see the pressure
+    #          difference interpolated between the initial and final flow states
+    def multirate(self, tspan):
+        fsi = self._fsi
+        n = self.control['subcycles']
+        times = np.linspace(tspan[0], tspan[1], n + 1)
+        if self.control['subcycled'] == 'flow':
+            x0 = fsi.sState.copy()
+            x1 = self.solveSolid(tspan)
+            for m in range(n):
+                # Boundary position at the middle of the substep
+                theta = (m + 0.5) / n
+                fsi.update('solid', times[m + 1], (1 - theta) * x0 + theta * x1)
+                fsi.update('regions', None, None)
+                fsi.update('flow', times[m + 1], self.solveFlow(times[m:m + 2]))
+            fsi.update('solid', tspan[1], x1)
+            fsi.update('regions', None, None)
+
+        elif self.control['subcycled'] == 'solid':
+            deltaPx0 = np.copy(fsi.flow().deltaPx[0])
+            fsi.update('flow', tspan[1], self.solveFlow(tspan))
+            deltaPx1 = np.copy(fsi.flow().deltaPx[0])
+            for m in range(n):
+                # Pressure difference at the middle of the substep
+                theta = (m + 0.5) / n
+                deltaPx = (1 - theta) * deltaPx0 + theta * deltaPx1
+                fsi.update('solid', times[m + 1], self.solveSolid(times[m:m + 2], deltaPx=deltaPx))
+            fsi.update('regions', None, None)
+
+        else:
+            sys.exit("ERROR: The subcycled field must be flow or solid...")
+
+    # Solve the flow in tspan from state0 (default is the current flow state),
+    # returns the final state
+    def solveFlow(self, tspan, state0=None):
+        fsi = self._fsi
+        method = self.control['integrator'][0]
+        if state0 is None:
+            state0 = fsi.fState
+        if method in fixedStepIntegrator.methods:
+            return self.stepper('flow', method, fsi.flow().rhs, fsi.flow().jac,
+                                state0.size).integrate(tspan, state0)
+        return self.integrate('flow', fsi.flow().rhs, tspan, state0, method,
+                              self.jacobian(method, fsi.flow().jac, fsi.flow().jacSparse), 0)
+
+    # Integrate with solve_ivp. With "regimeEvents" the integration stops at
+    # every friction regime switch of the flow rates (at y[offset:]) and is
+    # restarted from there, so no step crosses a discontinuity of the rhs.
+    # The integrator statistics of each field are reported at the end
+    def integrate(self, field, fun, tspan, y0, method, jac, offset):
+        stats = self.fieldStatistics(field)
+        events = 'regimeEvents' in self.control and self.control['regimeEvents'] == 'yes'
+        t0 = tspan[0]
+        while True:
+            sol = si.solve_ivp(fun,
+                               [t0, tspan[1]],
+                               y0,
+                               method=countingSolver(method),
+                               stats=stats,
+                               atol=self.control['atol'],
+                               rtol=self.control['rtol'],
+                               events=self._fsi.flow().regimeEvents(y0, offset) if events else None,
+                               **jac)
+            stats['steps'] += sol.t.size - 1
+            stats['nfev'] += sol.nfev
+            stats['njev'] += sol.njev
+            stats['nlu'] += sol.nlu
+            if sol.status != 1:  # No regime switch
+                return sol.y[:, -1]
+            stats['switches'] += 1
+            t0 = sol.t[-1]
+            y0 = sol.y[:, -1]
+
+    # Statistics of the scipy integrations of a field
+    def fieldStatistics(self, field):
+        if field not in self.statistics:
+            self.statistics[field] = {'steps': 0, 'rejected': 0, 'nfev': 0, 'njev': 0, 'nlu': 0, 'switches': 0}
+        return self.statistics[field]
+
+    # Solve the solid in tspan from state0 (default is the current solid state)
+    # under the pressure difference deltaPx (default is the current one),
+    # returns the final state. The "exact" integrator uses the exponential
+    # propagator of the modal equations
+    def solveSolid(self, tspan, state0=None, deltaPx=None):
+        fsi = self._fsi
+        method = self.control['integrator'][1]
+        if state0 is None:
+            state0 = fsi.sState
+        if method == 'exact':
+            return fsi.propagateSolid(tspan, state0, deltaPx)
+        if method in fixedStepIntegrator.methods:
+            return self.stepper('solid', method, fsi.rhsSolid, fsi.jacSolid,
+                                state0.size).integrate(tspan, state0, (deltaPx,))
+        stats = self.fieldStatistics('solid')
+        sSol = si.solve_ivp(fsi.rhsSolid,
+                            tspan,
+                            state0,
+                            method=countingSolver(method),
+                            stats=stats,
+                            atol=self.control['atol'],
+                            rtol=self.control['rtol'],
+                            args=(deltaPx,),
+                            **self.jacobian(method, fsi.jacSolid, fsi.jacSolidSparse))
+        stats['steps'] += sSol.t.size - 1
+        stats['nfev'] += sSol.nfev
+        stats['njev'] += sSol.njev
+        stats['nlu'] += sSol.nlu
+        return sSol.y[:, -1]